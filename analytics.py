@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+結果ストア（results_store.py の intervals）から「枠がいつ空くか」を集計し、ポーリング計画を出す。
+集計は SQLite の window 関数 / GROUP BY で行い、Python 側で 1 行ずつ回さない。
+
+- 空いた（opening）= 同じ枠（施設・日付・開始時刻）で NO の次に YES になった区間
+  ERROR の区間は無視する。最初から YES だった枠はいつ空いたか分からないので数えない
+- 空いた時刻   = YES を最初に見た run_ts（実際はその前の NO を最後に見た時刻との間。幅も出す）
+- 何日前か     = 日付 - 空いた時刻
+- 空いていた長さ = 次に NO を見た時刻 - 空いた時刻（まだ空いていれば未確定として別に数える）
+
+曜日 × 開始時刻ごとの表と、空いた時刻の「曜日 × 時」の分布から
+全体の coverage（既定 80%）を占める時間帯だけ細かく回すポーリング計画を出す。
+計画は .cache/poll_schedule.json にも保存する（watch.py などから読める形）。
+
+  python analytics.py [--db .cache/results.sqlite3] [--coverage 0.8] [--min-openings 5]
+"""
+
+import argparse
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from results_store import DEFAULT_DB_PATH
+
+SCHEDULE_PATH = Path(".cache/poll_schedule.json")
+DOW_LABELS = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]  # SQLite strftime('%w') の順
+DEFAULT_IDLE_MIN = 60
+
+OPENINGS_SQL = """
+WITH seq AS (
+    SELECT *,
+           LAG(available) OVER w AS prev_available,
+           LAG(until)     OVER w AS prev_until
+    FROM intervals
+    WHERE available IN ('YES', 'NO')
+    WINDOW w AS (PARTITION BY accommodation, date, start ORDER BY since)
+),
+closes AS (
+    SELECT accommodation, date, start, available, since AS closed_at,
+           LAG(available) OVER w AS prev_available
+    FROM intervals
+    WHERE available IN ('YES', 'NO')
+    WINDOW w AS (PARTITION BY accommodation, date, start ORDER BY since)
+)
+SELECT s.accommodation, s.weekday, s.start, s.date,
+       s.since                                                   AS opened_at,
+       julianday(s.date) - julianday(s.since)                    AS days_before,
+       CAST(strftime('%H', s.since) AS INTEGER)                  AS release_hour,
+       CAST(strftime('%w', s.since) AS INTEGER)                  AS release_dow,
+       (julianday(s.since) - julianday(s.prev_until)) * 1440     AS uncertainty_min,
+       (SELECT (julianday(MIN(c.closed_at)) - julianday(s.since)) * 24
+          FROM closes c
+         WHERE c.accommodation = s.accommodation AND c.date = s.date AND c.start = s.start
+           AND c.closed_at > s.since AND c.prev_available = 'YES'
+           AND c.available = 'NO') AS open_hours  -- YES→YES（ラベルだけ変わった行）は閉じていない
+FROM seq s
+WHERE s.available = 'YES' AND s.prev_available = 'NO'
+"""
+
+SLOT_SUMMARY_SQL = f"""
+WITH o AS ({OPENINGS_SQL}),
+ranked AS (
+    SELECT *,
+           ROW_NUMBER() OVER (PARTITION BY weekday, start ORDER BY days_before) AS rn,
+           COUNT(*)     OVER (PARTITION BY weekday, start)                      AS n
+    FROM o
+),
+hours AS (
+    SELECT weekday, start, release_hour, COUNT(*) AS c,
+           ROW_NUMBER() OVER (PARTITION BY weekday, start ORDER BY COUNT(*) DESC, release_hour) AS r
+    FROM o GROUP BY weekday, start, release_hour
+)
+SELECT r.weekday, r.start,
+       COUNT(*)                                                           AS openings,
+       ROUND(AVG(CASE WHEN rn IN ((n + 1) / 2, (n + 2) / 2) THEN days_before END) * 1.0, 1)
+                                                                          AS median_days_before,
+       ROUND(MIN(days_before), 1)                                         AS min_days_before,
+       ROUND(MAX(days_before), 1)                                         AS max_days_before,
+       (SELECT release_hour FROM hours h
+         WHERE h.weekday = r.weekday AND h.start = r.start AND h.r = 1)   AS typical_hour,
+       ROUND(AVG(open_hours), 1)                                          AS avg_open_hours,
+       SUM(open_hours IS NULL)                                            AS still_open,
+       ROUND(AVG(uncertainty_min), 0)                                     AS avg_uncertainty_min
+FROM ranked r
+GROUP BY r.weekday, r.start
+ORDER BY openings DESC, r.weekday, r.start
+"""
+
+RELEASE_HIST_SQL = f"""
+WITH o AS ({OPENINGS_SQL})
+SELECT release_dow, release_hour, COUNT(*) AS openings
+FROM o GROUP BY release_dow, release_hour
+ORDER BY openings DESC, release_dow, release_hour
+"""
+
+MEDIAN_OPEN_SQL = f"""
+WITH o AS ({OPENINGS_SQL}),
+closed AS (
+    SELECT open_hours,
+           ROW_NUMBER() OVER (ORDER BY open_hours) AS rn,
+           COUNT(*)     OVER ()                     AS n
+    FROM o WHERE open_hours IS NOT NULL
+)
+SELECT AVG(open_hours) FROM closed WHERE rn IN ((n + 1) / 2, (n + 2) / 2)
+"""
+
+
+# ========= 集計 =========
+def query(db: sqlite3.Connection, sql: str) -> list[dict]:
+    cur = db.execute(sql)
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur]
+
+
+def slot_summary(db: sqlite3.Connection) -> list[dict]:
+    return query(db, SLOT_SUMMARY_SQL)
+
+
+def release_histogram(db: sqlite3.Connection) -> list[dict]:
+    return query(db, RELEASE_HIST_SQL)
+
+
+def median_open_hours(db: sqlite3.Connection) -> float | None:
+    (v,) = db.execute(MEDIAN_OPEN_SQL).fetchone()
+    return v
+
+
+# ========= 計画 =========
+def recommend_schedule(hist: list[dict], median_open: float | None, coverage: float = 0.8,
+                       idle_min: int = DEFAULT_IDLE_MIN) -> dict:
+    """空いた件数の多い「曜日 × 時」から順に coverage に達するまで拾い、その時間帯だけ細かく回す。
+    細かい間隔は空いている長さの中央値の 1/4（2〜15 分に丸める）。"""
+    total = sum(h["openings"] for h in hist)
+    windows, acc = [], 0
+    for h in hist:
+        if total and acc / total >= coverage:
+            break
+        windows.append({"dow": DOW_LABELS[h["release_dow"]], "hour": h["release_hour"], "openings": h["openings"]})
+        acc += h["openings"]
+    fast = 15 if median_open is None else int(min(15, max(2, median_open * 60 / 4)))
+
+    # cron（run_ts と同じタイムゾーン）: 曜日ごとに時をまとめる
+    by_dow: dict[str, list[int]] = {}
+    for w in windows:
+        by_dow.setdefault(w["dow"], []).append(w["hour"])
+    cron = [f"*/{fast} {','.join(str(h) for h in sorted(hs))} * * {DOW_LABELS.index(d)}"
+            for d, hs in sorted(by_dow.items(), key=lambda kv: DOW_LABELS.index(kv[0]))]
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "openings": total,
+        "coverage": round(acc / total, 3) if total else 0.0,
+        "fast_interval_min": fast,
+        "idle_interval_min": idle_min,
+        "median_open_hours": None if median_open is None else round(median_open, 2),
+        "windows": windows,
+        "cron": cron,
+    }
+
+
+# ========= 出力 =========
+def print_table(rows: list[dict], cols: list[str]):
+    if not rows:
+        return
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in cols}
+    print("  ".join(c.rjust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(str(r[c]).rjust(widths[c]) for c in cols))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="slot-opening analytics and polling schedule")
+    ap.add_argument("--db", default=str(DEFAULT_DB_PATH))
+    ap.add_argument("--coverage", type=float, default=0.8, help="細かく回す時間帯で拾う空きの割合")
+    ap.add_argument("--min-openings", type=int, default=5, help="計画を出すのに必要な空きの件数")
+    ap.add_argument("--idle", type=int, default=DEFAULT_IDLE_MIN, help="それ以外の時間帯の間隔（分）")
+    ap.add_argument("--out", default=str(SCHEDULE_PATH))
+    args = ap.parse_args(argv)
+
+    if not Path(args.db).exists():
+        print(f"no results store at {args.db}")
+        return
+    db = sqlite3.connect(args.db)
+    try:
+        summary = slot_summary(db)
+        hist = release_histogram(db)
+        median_open = median_open_hours(db)
+    finally:
+        db.close()
+
+    print("== 曜日 × 開始時刻ごとの空き方 ==")
+    print_table(summary, ["weekday", "start", "openings", "median_days_before", "min_days_before",
+                          "max_days_before", "typical_hour", "avg_open_hours", "still_open",
+                          "avg_uncertainty_min"])
+    total = sum(h["openings"] for h in hist)
+    if total < args.min_openings:
+        print(f"\nopenings: {total}（{args.min_openings} 件未満なので計画は出さない）")
+        return
+
+    plan = recommend_schedule(hist, median_open, args.coverage, args.idle)
+    print(f"\n== ポーリング計画（空き {total} 件中 {plan['coverage']:.0%} をカバー） ==")
+    for w in plan["windows"]:
+        print(f"  {w['dow']} {w['hour']:02d}:00-{w['hour']:02d}:59  {plan['fast_interval_min']} 分おき"
+              f"  ({w['openings']} openings)")
+    print(f"  それ以外           {plan['idle_interval_min']} 分おき")
+    print("cron:")
+    for line in plan["cron"]:
+        print(f"  {line}")
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(plan, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+空き状況のローカルキャッシュ（SQLite）。
+- キー: (accommodation id, 日付, 所要時間)
+- 値:   その日の時刻ラベル一覧（time_has_start が読むのと同じ "20:00 - 21:30" 形式。timeslots.py で枠に読み直す）
+- TTL を過ぎたものだけサイトに取りに行く。max_age で 1 回だけ上書きも可（0 = 全部取り直し）
+- 件数が max_entries を超えたら最後に使われたのが古い順に捨てる（LRU）
+
+数分おきに cron で回してもサイトへのアクセスは古くなったキーの分だけで済む。
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(".cache/availability.sqlite3")
+DEFAULT_TTL = 15 * 60  # 秒
+DEFAULT_MAX_ENTRIES = 2000
+
+
+class AvailabilityCache:
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS slots (
+                accommodation TEXT NOT NULL,
+                date          TEXT NOT NULL,
+                duration      TEXT NOT NULL,
+                labels        TEXT NOT NULL,
+                fetched_at    REAL NOT NULL,
+                used_at       REAL NOT NULL,
+                PRIMARY KEY (accommodation, date, duration)
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS slots_used_at ON slots(used_at)")
+        self.db.commit()
+
+    def get(self, accommodation: str, date: str, duration: str,
+            max_age: float | None = None) -> list[str] | None:
+        """新しければラベル一覧、無い/古ければ None。"""
+        limit = self.ttl if max_age is None else max_age
+        row = self.db.execute(
+            "SELECT labels, fetched_at FROM slots WHERE accommodation=? AND date=? AND duration=?",
+            (accommodation, date, duration),
+        ).fetchone()
+        now = time.time()
+        if not row or now - row[1] > limit:
+            return None
+        self.db.execute(
+            "UPDATE slots SET used_at=? WHERE accommodation=? AND date=? AND duration=?",
+            (now, accommodation, date, duration),
+        )
+        self.db.commit()
+        return json.loads(row[0])
+
+    def put(self, accommodation: str, date: str, duration: str, labels: list[str]):
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO slots VALUES (?, ?, ?, ?, ?, ?)",
+            (accommodation, date, duration, json.dumps(labels, ensure_ascii=False), now, now),
+        )
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        (n,) = self.db.execute("SELECT COUNT(*) FROM slots").fetchone()
+        if n > self.max_entries:
+            self.db.execute(
+                "DELETE FROM slots WHERE rowid IN (SELECT rowid FROM slots ORDER BY used_at LIMIT ?)",
+                (n - self.max_entries,),
+            )
+
+    def purge_past(self, today: str):
+        """today（YYYY-MM-DD）より前の日付の行を消す。チェッカーの起動時に呼ぶ。
+        TTL 切れの行は残す（件数は max_entries の LRU で抑え、timeslots.py の問い合わせにも使う）。"""
+        self.db.execute("DELETE FROM slots WHERE date < ?", (today,))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+fixture_server.py を相手に check_next2weeks_targets.py を実行して性能を測るベンチマーク。
+本番サイト（avo.hta.nl）には一切アクセスしない。
+
+対象件数（既定 3 / 10 / 50 / 200）× エンジンごとに、一時ディレクトリに slots.json を作って
+チェッカーを別プロセスで実行し、次を表にする:
+  wall_s       実行時間（プロセス起動から終了まで）
+  peak_rss_mb  最大 RSS（wait4 の ru_maxrss。チェッカーと待ち受け済みの子孫のうち一番大きい 1 プロセスの値で、
+               合計ではない。playwright ではブラウザ全体の使用量より小さく出る）
+  requests     fixture が受けたリクエスト数（と 1 対象あたり）
+  errors       ERROR になった対象の数
+
+エンジン指定（--engines、カンマ区切り）:
+  http / playwright / playwright:N（CONCURRENCY=N でコンテキスト N 個）
+  playwright は fixtures/static/ に js 一式（リポジトリには含めていない）が無いと datepicker が動かないので、
+  足りなければ計測を始める前にエラーで止める（fixture_server.missing_static）。
+
+  python bench.py --engines http,playwright:4 --latency 120 --scenario sparse --out bench.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fixture_server import add_server_args, missing_static, server_options, serve_in_thread
+
+ROOT = Path(__file__).resolve().parent
+CHECKER = ROOT / "check_next2weeks_targets.py"
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# fixture の時刻一覧と同じ 15 分刻み（15:00〜22:00）
+STARTS = [f"{h:02d}:{m:02d}" for h in range(15, 23) for m in (0, 15, 30, 45) if (h, m) <= (22, 0)]
+
+
+def make_targets(n: int) -> list[dict]:
+    """曜日 × 開始時刻を順に並べて n 件（足りなければ先頭から繰り返す）。"""
+    pairs = [(wd, s) for s in STARTS for wd in WEEKDAYS]
+    return [{"weekday": pairs[i % len(pairs)][0], "start": pairs[i % len(pairs)][1]} for i in range(n)]
+
+
+def parse_engine(spec: str) -> tuple[str, dict]:
+    name, _, conc = spec.partition(":")
+    env = {"ENGINE": name}
+    if conc:
+        env["CONCURRENCY"] = conc
+    return name, env
+
+
+def run_once(book_url: str, srv, n: int, engine_spec: str, rate_limit: float) -> dict:
+    _, engine_env = parse_engine(engine_spec)
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        Path(tmp, "slots.json").write_text(
+            json.dumps({"weeks_ahead": 2, "concurrency": 1, "targets": make_targets(n)}), encoding="utf-8")
+        env = dict(os.environ, BOOK_URL=book_url, CACHE_TTL="0", RATE_LIMIT=str(rate_limit),
+                   HEADLESS="true", SCREENSHOTS="false", TIMING_LOG=str(Path(tmp, "timing.jsonl")))
+        env.pop("GITHUB_STEP_SUMMARY", None)
+        env.update(engine_env)
+
+        before = dict(srv.stats)
+        out_path, err_path = Path(tmp, "stdout.txt"), Path(tmp, "stderr.txt")
+        with out_path.open("w", encoding="utf-8") as fo, err_path.open("w", encoding="utf-8") as fe:
+            t0 = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, str(CHECKER)], cwd=tmp, env=env, stdout=fo, stderr=fe)
+            code, rss_kb = wait_with_rusage(proc)
+            wall = time.perf_counter() - t0
+        out = out_path.read_text(encoding="utf-8", errors="replace")
+        err = err_path.read_text(encoding="utf-8", errors="replace")
+
+    after = dict(srv.stats)
+    by_path = {k: after.get(k, 0) - before.get(k, 0) for k in after if not k.startswith("_")}
+    total = after.get("_total", 0) - before.get("_total", 0)
+    return {
+        "engine": engine_spec,
+        "targets": n,
+        "wall_s": round(wall, 2),
+        "peak_rss_mb": round(rss_kb / 1024, 1) if rss_kb else None,
+        "requests": total,
+        "requests_per_target": round(total / n, 2),
+        "by_path": {k: v for k, v in by_path.items() if v},
+        "errors": out.count("ERROR"),
+        "exit_code": code,
+        "stderr_tail": err.strip().splitlines()[-3:] if code else [],
+    }
+
+
+def wait_with_rusage(proc) -> tuple[int, int | None]:
+    """子プロセスの終了を待って (終了コード, 最大 RSS KB) を返す。wait4 が無い環境では RSS は None。"""
+    if not hasattr(os, "wait4"):
+        return proc.wait(), None
+    _, status, ru = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # macOS は bytes、Linux は KB
+    return proc.returncode, ru.ru_maxrss // 1024 if sys.platform == "darwin" else ru.ru_maxrss
+
+
+def print_table(rows: list[dict]):
+    cols = ["engine", "targets", "wall_s", "peak_rss_mb", "requests", "requests_per_target", "errors"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in cols}
+    print("  ".join(c.rjust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(str(r[c]).rjust(widths[c]) for c in cols), flush=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="court-checker benchmark (fixture server)")
+    ap.add_argument("--engines", default="http", help="http,playwright,playwright:4 ...")
+    ap.add_argument("--targets", default="3,10,50,200", help="対象件数（カンマ区切り）")
+    ap.add_argument("--repeat", type=int, default=1, help="同じ条件の繰り返し回数")
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="RATE_LIMIT（既定 0 = 間隔制限なし）")
+    ap.add_argument("--out", help="結果を JSON で保存するパス")
+    add_server_args(ap)
+    args = ap.parse_args(argv)
+
+    engines = [e.strip() for e in args.engines.split(",")]
+    missing = missing_static()
+    if missing and any(parse_engine(e)[0] != "http" for e in engines):
+        # 壊れたページの待ち時間を測っても意味が無いので始める前に止める
+        ap.error(f"playwright engine requires fixtures/static/{{{','.join(missing)}}} "
+                 f"(the Book page scripts, not shipped in this repo); use --engines http")
+
+    srv, book_url = serve_in_thread(**server_options(args))
+    rows = []
+    try:
+        for engine in engines:
+            for n in (int(x) for x in args.targets.split(",")):
+                for _ in range(args.repeat):
+                    r = run_once(book_url, srv, n, engine, args.rate_limit)
+                    rows.append(r)
+                    print(f"[BENCH] {r['engine']} x{n}: {r['wall_s']}s, {r['requests']} req"
+                          f"{'' if r['exit_code'] == 0 else ' (exit ' + str(r['exit_code']) + ')'}",
+                          file=sys.stderr, flush=True)
+    finally:
+        srv.shutdown()
+
+    print_table(rows)
+    if args.out:
+        payload = {"server": server_options(args), "results": rows}
+        Path(args.out).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Book ページ（jQuery UI datepicker + 時刻 select）の同期 Playwright 操作をまとめたもの。
+DOM は dom_extract.py で 1 回の evaluate にまとめて読み、照合は Python 側で行う。
+check_next2weeks_targets.py と各モード（matrix など）から共通で使う。
+"""
+
+from datetime import datetime
+
+from dom_extract import (
+    MONTH_ABBR,
+    snapshot_selects,
+    snapshot_calendar,
+    find_duration_select,
+    find_time_select,
+    option_value,
+    select_labels,
+    month_option_value,
+    day_link_index,
+    month_availability,
+    month_groups,
+    select_locator,
+    snapshot_tariff,
+)
+from timeslots import Timeslot, match_slots, parse_label, to_tariff, with_tariff
+
+DURATION_PREFERRED = "1,5 uur"
+
+
+# ========= 画面操作 =========
+def set_duration(page, preferred: str = DURATION_PREFERRED):
+    """preferred（既定 1,5 uur）が選べれば選択、無ければ 1 uur を選択。"""
+    page.wait_for_selector("select", timeout=20000)
+    target = find_duration_select(snapshot_selects(page))
+    if not target:
+        return
+    want = preferred if preferred in target["text"] else "1 uur"
+    value = option_value(target, want)
+    if value is not None:
+        select_locator(page, target).select_option(value)
+
+
+def open_datepicker(page) -> bool:
+    """日付ピッカーを開く（複数の候補で試行）。"""
+    try:
+        el = page.get_by_label("Voor wanneer?")
+        el.click()
+        return True
+    except Exception:
+        pass
+    try:
+        page.locator(".ui-datepicker-trigger").first.click()
+        return True
+    except Exception:
+        pass
+    for sel in ["input.hasDatepicker", "input[id*='date']", "input[name*='date']"]:
+        try:
+            inp = page.locator(sel).first
+            if inp.count():
+                inp.click()
+                return True
+        except Exception:
+            continue
+    return False
+
+
+def set_month_year_in_datepicker(page, d: datetime):
+    """datepicker の月/年セレクタに合わせる（0/1始まり・略称の両対応）。"""
+    cal = snapshot_calendar(page)
+    if not cal:
+        return
+    if cal["year_options"] and cal["year"] != str(d.year):
+        try:
+            page.locator(".ui-datepicker select.ui-datepicker-year").first.select_option(str(d.year), force=True)
+            cal = snapshot_calendar(page) or cal  # 年を変えると月の選択肢が変わる
+        except Exception:
+            pass
+    if cal["month_options"]:
+        val = month_option_value(cal["month_options"], d)
+        if val is not None and val != cal["month"]:
+            page.locator(".ui-datepicker select.ui-datepicker-month").first.select_option(val, force=True)
+
+
+def click_day_in_calendar(page, day: int) -> bool:
+    idx = day_link_index(snapshot_calendar(page), day)
+    if idx < 0:
+        return False
+    try:
+        page.locator(".ui-datepicker .ui-datepicker-calendar a.ui-state-default").nth(idx).click()
+        return True
+    except Exception:
+        return False
+
+
+def time_has_start(page, start_hhmm: str, min_minutes: int = 0) -> tuple[bool, str]:
+    """『Welke tijd』のセレクトから指定開始時刻オプションの有無を確認（長さは timeslots.match_slots、枠は時間単価付き）。"""
+    return match_slots(read_time_slots(page), start_hhmm, min_minutes)
+
+
+def read_time_labels(page) -> list[str]:
+    """時刻セレクト（':' を含む最初の select）の全ラベルを返す。"""
+    return select_labels(find_time_select(snapshot_selects(page)))
+
+
+def read_time_slots(page) -> list[Timeslot]:
+    """時刻セレクトの option を枠 id・時間単価（#tarief / #tariefId）付きの Timeslot にする。"""
+    select = find_time_select(snapshot_selects(page))
+    slots = [s for s in (parse_label(o["text"], o["value"]) for o in (select or {}).get("options", [])) if s]
+    tariff = snapshot_tariff(page)
+    return with_tariff(slots, to_tariff(tariff["tarief"]), tariff["tariefId"])
+
+
+def read_month_availability(page) -> tuple[list[int], list[int]]:
+    """表示中の月の (選択可の日, 選択不可の日) を返す（probe_calendar_month.py と同じ読み方）。"""
+    return month_availability(snapshot_calendar(page))
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+ブラウザのプロファイル（Cookie・ASP.NET セッション・静的ファイルの HTTP キャッシュ）を実行間で使い回す。
+
+BROWSER_PROFILE=.cache/browser-profile のようにディレクトリを指定すると
+launch_persistent_context で起動する（未指定なら従来どおり毎回まっさらな new_context）。
+- ディスクキャッシュの上限は PROFILE_MAX_MB（既定 200）。Chromium にも --disk-cache-size で渡す
+- 起動前にディレクトリが上限を超えていたらキャッシュ系のサブディレクトリだけ消し、
+  それでも超えていればプロファイルごと作り直す
+- 起動に失敗したら（前回の異常終了で残ったロック・壊れたプロファイル）
+  ロックを消して 1 回、だめならプロファイルを退避して作り直してもう 1 回
+
+persistent context はコンテキストが 1 つだけなので、CONCURRENCY>1 のプールでは使わない。
+
+BROWSER_ENDPOINT（browser_server.py）が使えるときはそちらが優先で、共有の Chromium に繋いで
+自分用の new_context を作る。close() は接続を切るだけで、共有の Chromium は止めない。
+"""
+
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import browser_server
+
+PROFILE_DIR = os.getenv("BROWSER_PROFILE", "")
+PROFILE_MAX_MB = float(os.getenv("PROFILE_MAX_MB", "200"))
+
+# 消しても Cookie やセッションは残るキャッシュ類
+CACHE_SUBDIRS = ["Default/Cache", "Default/Code Cache", "Default/GPUCache", "GrShaderCache",
+                 "ShaderCache", "Default/Service Worker/CacheStorage"]
+LOCK_FILES = ["SingletonLock", "SingletonSocket", "SingletonCookie"]
+
+
+def log(msg): print("[LOG]", msg, file=sys.stderr, flush=True)
+
+
+def dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(root, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def trim_profile(path: Path, max_mb: float = PROFILE_MAX_MB):
+    """上限を超えていればキャッシュを消し、まだ超えていればプロファイルごと作り直す。"""
+    limit = max_mb * 1024 * 1024
+    if not path.exists() or dir_size(path) <= limit:
+        return
+    for sub in CACHE_SUBDIRS:
+        shutil.rmtree(path / sub, ignore_errors=True)
+    if dir_size(path) > limit:
+        log(f"browser profile over {max_mb:.0f}MB; resetting")
+        reset_profile(path)
+
+
+def reset_profile(path: Path):
+    """壊れたプロファイルを退避（消せなければ削除）して空にする。退避は 1 世代だけ残す。"""
+    if not path.exists():
+        return
+    aside = path.with_name(path.name + ".broken")
+    shutil.rmtree(aside, ignore_errors=True)
+    try:
+        path.rename(aside)
+    except OSError:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def clear_locks(path: Path):
+    for name in LOCK_FILES:
+        try:
+            (path / name).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            pass
+
+
+def connect(p):
+    """共有の Chromium に繋ぐ。エンドポイントが無い・繋がらなければ None。"""
+    ep = browser_server.endpoint()
+    if not ep:
+        return None
+    try:
+        return p.chromium.connect_over_cdp(ep, timeout=10000)
+    except Exception as e:
+        log(f"browser server {ep} unavailable ({str(e)[:80]}); launching locally")
+        return None
+
+
+async def async_connect(p):
+    ep = browser_server.endpoint()
+    if not ep:
+        return None
+    try:
+        return await p.chromium.connect_over_cdp(ep, timeout=10000)
+    except Exception as e:
+        log(f"browser server {ep} unavailable ({str(e)[:80]}); launching locally")
+        return None
+
+
+def launch(p, headless: bool, profile_dir: str = PROFILE_DIR, max_mb: float = PROFILE_MAX_MB):
+    """(browser, context) を返す。persistent のとき browser は None（context.close() で終了）。"""
+    shared = connect(p)
+    if shared is not None:
+        return shared, shared.new_context()
+    if not profile_dir:
+        browser = p.chromium.launch(headless=headless)
+        return browser, browser.new_context()
+
+    path = Path(profile_dir)
+    trim_profile(path, max_mb)
+    args = [f"--disk-cache-size={int(max_mb * 1024 * 1024)}"]
+    for attempt in range(3):
+        path.mkdir(parents=True, exist_ok=True)
+        try:
+            return None, p.chromium.launch_persistent_context(str(path), headless=headless, args=args)
+        except Exception as e:
+            if attempt == 0:
+                log(f"persistent context failed ({str(e)[:80]}); clearing locks")
+                clear_locks(path)
+            elif attempt == 1:
+                log("persistent context failed again; resetting profile")
+                reset_profile(path)
+            else:
+                raise
+            time.sleep(0.5)
+
+
+async def async_launch(p, headless: bool):
+    """プール用（コンテキストは呼び出し側で作る）。共有の Chromium があればそれに繋ぐ。"""
+    shared = await async_connect(p)
+    return shared if shared is not None else await p.chromium.launch(headless=headless)
+
+
+def close(browser, context):
+    for closer in (context.close, browser.close if browser else None):
+        try:
+            if closer:
+                closer()
+        except Exception:
+            pass
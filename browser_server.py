@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+複数のチェッカープロセスで 1 つの Chromium を共有するためのサーバ（と監視役）。
+各プロセスは connect_over_cdp で繋いで自分用のコンテキストを作るだけなので、
+施設や設定ごとに cron で並べても Chromium の起動と数百 MB のメモリは 1 回分で済む。
+
+Python 版 Playwright には launch_server が無いので、Playwright 同梱の Chromium を
+--remote-debugging-port 付きで直接起動し、その CDP エンドポイントを共有する。
+
+  python browser_server.py [--port 9222] [--headed]
+    - Chromium を起動し、エンドポイントを .cache/browser_server.json に書く
+    - HEALTH_INTERVAL 秒ごとに /json/version を確認し、落ちていたら待ち時間を伸ばしつつ再起動
+    - SIGTERM / Ctrl-C で Chromium を止めてエンドポイントのファイルを消す
+
+クライアント側（check_next2weeks_targets.py / concurrent_check.py / watch.py）:
+  BROWSER_ENDPOINT=auto                 … .cache/browser_server.json を読む
+  BROWSER_ENDPOINT=http://127.0.0.1:9222 … 直接指定
+  繋がらなければ従来どおり自前で起動する。
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import time
+from pathlib import Path
+
+ENDPOINT_FILE = Path(".cache/browser_server.json")
+SERVER_PROFILE = Path(".cache/browser-server")
+HEALTH_INTERVAL = float(os.getenv("HEALTH_INTERVAL", "10"))
+MAX_BACKOFF = 60.0
+
+
+def log(msg): print("[LOG]", msg, flush=True)
+
+
+# ========= クライアント側 =========
+def endpoint() -> str | None:
+    """BROWSER_ENDPOINT から接続先を決める（未設定・サーバ無しなら None）。"""
+    env = os.getenv("BROWSER_ENDPOINT", "")
+    if env.lower() != "auto":
+        return env or None
+    try:
+        return json.loads(ENDPOINT_FILE.read_text(encoding="utf-8"))["endpoint"]
+    except Exception:
+        return None
+
+
+def is_alive(ep: str, timeout: float = 2.0) -> bool:
+    # urllib.request は http.client / ssl を引き込むので、繋ぎに行くときだけ読み込む
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(ep.rstrip("/") + "/json/version", timeout=timeout) as r:
+            return r.status == 200
+    except Exception:
+        return False
+
+
+# ========= サーバ側 =========
+def chromium_path() -> str:
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def start_chromium(exe: str, port: int, headless: bool) -> subprocess.Popen:
+    SERVER_PROFILE.mkdir(parents=True, exist_ok=True)
+    args = [
+        exe,
+        f"--remote-debugging-port={port}",
+        "--remote-debugging-address=127.0.0.1",
+        f"--user-data-dir={SERVER_PROFILE.resolve()}",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-background-networking",
+    ]
+    if headless:
+        args.append("--headless=new")
+    return subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(ep: str, proc: subprocess.Popen, timeout: float = 20.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if proc.poll() is not None:
+            return False
+        if is_alive(ep, timeout=1.0):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def stop(proc: subprocess.Popen | None):
+    if proc and proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _terminate(*_):
+    raise KeyboardInterrupt
+
+
+def supervise(port: int, headless: bool):
+    exe = chromium_path()
+    ep = f"http://127.0.0.1:{port}"
+    signal.signal(signal.SIGTERM, _terminate)
+    proc = None
+    failures = 0
+    try:
+        while True:
+            if proc is None or proc.poll() is not None or not is_alive(ep):
+                if proc is not None:
+                    failures += 1
+                    log(f"browser server down (exit={proc.poll()}); restarting")
+                    stop(proc)
+                    time.sleep(min(MAX_BACKOFF, 2 ** (failures - 1)))
+                proc = start_chromium(exe, port, headless)
+                if not wait_ready(ep, proc):
+                    continue
+                ENDPOINT_FILE.parent.mkdir(parents=True, exist_ok=True)
+                ENDPOINT_FILE.write_text(json.dumps({"endpoint": ep, "pid": proc.pid}), encoding="utf-8")
+                log(f"browser server ready: {ep} (pid {proc.pid})")
+            elif failures:
+                failures = 0
+            time.sleep(HEALTH_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop(proc)
+        try:
+            ENDPOINT_FILE.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="shared Chromium for court-checker processes")
+    ap.add_argument("--port", type=int, default=9222)
+    ap.add_argument("--headed", action="store_true", help="画面を出す（既定はヘッドレス）")
+    args = ap.parse_args()
+    supervise(args.port, not args.headed)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ from datetime import datetime, timedelta
 from playwright.sync_api import sync_playwright
 import re
 
+from readiness import wait_month_shown
+
 BOOK_URL = "https://avo.hta.nl/uithoorn/Accommodation/Book/106"
 
 # 再来週の固定スロット
@@ -103,7 +105,7 @@ def main():
                     except:
                         pass
 
-            page.wait_for_timeout(400)
+            wait_month_shown(page, d)
 
             # 3) カレンダーから「日」をクリック
             # ボタンに日数字だけが表示される要素を探してクリック
@@ -2,6 +2,8 @@ from datetime import datetime, timedelta
 from playwright.sync_api import sync_playwright
 import re, time
 
+from readiness import wait_ajax_idle, wait_book_ready
+
 BOOK_URL = "https://avo.hta.nl/uithoorn/Accommodation/Book/106"
 
 # チェック対象（再来週の 月・木・日）
@@ -119,7 +121,7 @@ def main():
 
         log("Open:", BOOK_URL)
         page.goto(BOOK_URL, wait_until="domcontentloaded")
-        page.wait_for_timeout(600)
+        wait_book_ready(page)
 
         # Duration: 1,5 uur（無ければ 1 uur）
         dur = find_duration_select(page)
@@ -157,7 +159,7 @@ def main():
 
             # 年月日をセット
             set_date_by_selects(sel_day, sel_month, sel_year, d)
-            page.wait_for_timeout(500)  # 反映待ち
+            wait_ajax_idle(page)  # 時刻一覧の AJAX 完了待ち
 
             # 時刻セレクトを検出
             time_sel = find_time_select(page)
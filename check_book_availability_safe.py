@@ -2,6 +2,8 @@ from datetime import datetime, timedelta
 from playwright.sync_api import sync_playwright
 import re, sys, time
 
+from readiness import wait_ajax_idle, wait_book_ready
+
 BOOK_URL = "https://avo.hta.nl/uithoorn/Accommodation/Book/106"
 
 # 2週間後の 月/木/日（固定）をチェック
@@ -77,7 +79,7 @@ def main():
 
         log(f"Open: {BOOK_URL}")
         page.goto(BOOK_URL, wait_until="domcontentloaded")
-        page.wait_for_timeout(800)
+        wait_book_ready(page)
 
         # 1) Duration（1,5 uur を選択。無ければ 1 uur）
         dur_sel = pick_duration_select(page)
@@ -122,7 +124,7 @@ def main():
                 results.append((iso, wlbl, start, False, ""))
                 continue
 
-            page.wait_for_timeout(500)  # 反映待ち
+            wait_ajax_idle(page)  # 時刻一覧の AJAX 完了待ち
 
             time_sel = pick_time_select(page)
             if not time_sel:
@@ -1,16 +1,49 @@
 # -*- coding: utf-8 -*-
 """
 Uithoorn 体育館の予約可否を「再来週の 月/木/日 固定時間」でチェック。
-- 実行結果は標準出力と results.csv に残す
-- 空きが見つかった日の画面を screenshots/ に保存
+- 実行結果は標準出力と .cache/results.sqlite3 に残す（results_store.py、変化が無い間は 1 区間にまとめる）
+  RESULTS_STORE=csv で従来どおり results.csv に追記、both で両方
+- 空きが見つかった日の証跡を screenshots/ に保存（evidence.py）
+  既定は予約フォーム部分だけの JPEG。EVIDENCE=full で全画面、dom で画像の代わりに JSON
 - CI( GitHub Actions )でも落ちにくいように待機時間拡大・リトライ・トレース保存
+  （TRACE_MODE=off/on-failure/always、既定は ERROR の出た施設分だけ traces/ に残す。trace_capture.py）
 
 切替：
   - HEADLESS=false でローカル目視（既定はヘッドレス）
+  - ENGINE=http でブラウザを使わず AJAX エンドポイントを直接叩く（http_engine.py）
+    失敗したら自動で Playwright にフォールバック
+  - BOOK_URL で接続先を差し替え（fixture_server.py でオフライン検証）
+  - CONCURRENCY=N（または slots.json の "concurrency"）で
+    ブラウザ 1 つ + コンテキスト N 個の並列チェック（concurrent_check.py）
+  - ブラウザを起動する前に Book ページの HTML を 1 回だけ GET し、disabledDates / 休館曜日 / minDate で
+    選べない日の対象は NO にしてしまう（day_index.py、PREFILTER=false で無効）
+  - 取得した時刻一覧は .cache/availability.sqlite3 にキャッシュ（availability_cache.py）
+    CACHE_TTL 秒（slots.json "cache_ttl"、既定 900、0 で無効）以内のものはサイトに聞かない
+    --max-age 秒 でその回だけ TTL を上書き（--max-age 0 で全部取り直し）
+  - 開始時刻が合っても duration（"1,5 uur"）より短い枠は YES にしない（timeslots.py）
+    キャッシュ済みの一覧は python timeslots.py 日付 --from 19:30 --to 20:30 --min 90 で引ける
+  - slots.json の "accommodations" で複数施設（各自の targets / duration）をまとめて判定
+    ブラウザ（または HTTP セッション）は 1 つを共有し、ホストごとにリクエスト間隔を制限（scheduler.py）
+  - BROWSER_PROFILE=ディレクトリ で Cookie・HTTP キャッシュを実行間で使い回す（browser_profile.py、PROFILE_MAX_MB）
+  - BROWSER_ENDPOINT=auto（または http://host:port）で browser_server.py が起動した共有の Chromium に繋ぐ
+    複数の設定・施設を cron で並べても Chromium の起動は 1 回分。繋がらなければ自前で起動
+  - 画像・フォント・CSS・地図タイル等は読み込まない（resource_filter.py、BLOCK_RESOURCES=auto/true/false）
+    画像の証跡を撮る回（SCREENSHOTS=true かつ EVIDENCE=clip/full、既定）も CSS だけ通して残りは止める
+  - 各フェーズの所要時間を .cache/timing.jsonl に記録し、最後に p50/p95 の表を標準エラーへ（timing.py）
+    GitHub Actions では同じ表を Step Summary にも出す。TIMING=false で無効
+  - MODE=matrix で horizon 全体の「日付 × 開始時刻」表を matrix.csv / matrix.json に出力
+    （HORIZON_WEEKS または slots.json の "horizon_weeks"、既定 6 週）
+  - MODE=series で各対象を終了日（SERIES_UNTIL または slots.json の "series_until"、既定は次の 6/30）まで
+    毎週に展開し、日付ごとの可否と何週連続で取れるかを series.json に出力（series_mode.py）
+  - MODE=search で検索フォーム（Accommodation/Search）に対象ごとに 1 回聞き、
+    空いている施設の一覧を search.json に出力（search_mode.py、slots.json の "search": {"activity": 6}）
+  - MODE=sweep で所要時間の選択肢（1 uur / 1,5 uur / 2 uur ...）を 1 回の実行でまとめて調べ、
+    horizon の日付ごとの「所要時間 × 開始時刻」表を sweep.csv / sweep.json に出力（sweep_mode.py、ブラウザ無し）
   - slots.json があれば weeks_ahead / targets を上書き
     例:
     {
       "weeks_ahead": 2,
+      "concurrency": 3,
       "targets": [
         {"weekday":"Mon","start":"20:00"},
         {"weekday":"Thu","start":"20:00"},
@@ -20,17 +53,56 @@ Uithoorn 体育館の予約可否を「再来週の 月/木/日 固定時間」
 """
 
 import os
+import re
+import sys
 import csv
+import json
+import argparse
 from pathlib import Path
 from datetime import datetime, timedelta
-from playwright.sync_api import sync_playwright
+
+from book_page import (
+    month_groups,
+    set_duration,
+    open_datepicker,
+    set_month_year_in_datepicker,
+    click_day_in_calendar,
+    read_time_slots,
+)
+from http_engine import HttpEngine, HttpEngineError, HttpSession
+from readiness import (
+    goto_ready,
+    reload_ready,
+    wait_ajax_idle,
+    wait_datepicker_visible,
+    wait_month_shown,
+    click_and_wait_timeslots,
+)
+from day_index import fetch_day_index
+from timeslots import duration_minutes, from_labels, match_slots, match_start
+from availability_cache import AvailabilityCache, DEFAULT_TTL, DEFAULT_MAX_ENTRIES
+from scheduler import HostRateLimiter, load_accommodations
+from results_store import ResultsStore, DEFAULT_DB_PATH as RESULTS_DB
+from resource_filter import blocking_enabled, install as install_resource_filter
+from trace_capture import TRACE_MODE, TraceRecorder, has_error
+from evidence import EvidenceWriter, EVIDENCE_MODE
+import timing
+from timing import phase
 
 # ----------------- 設定 -----------------
-BOOK_URL = "https://avo.hta.nl/uithoorn/Accommodation/Book/106"
+BOOK_URL = os.getenv("BOOK_URL", "https://avo.hta.nl/uithoorn/Accommodation/Book/106")
 RESULTS_CSV = Path("results.csv")
+CACHE_PATH = Path(os.getenv("CACHE_PATH", ".cache/availability.sqlite3"))
 SCREENSHOT_DIR = Path("screenshots")
 
 HEADLESS = os.getenv("HEADLESS", "true").lower() == "true"
+SCREENSHOTS = os.getenv("SCREENSHOTS", "true").lower() == "true"  # 空きの日の証跡を保存するか
+EVIDENCE = EvidenceWriter(SCREENSHOT_DIR, EVIDENCE_MODE if SCREENSHOTS else "off")
+ENGINE = os.getenv("ENGINE", "playwright").lower()  # playwright / http
+RESULTS_STORE = os.getenv("RESULTS_STORE", "sqlite").lower()  # sqlite / csv / both
+MODE = os.getenv("MODE", "targets").lower()  # targets / matrix / search / series / sweep
+PREFILTER = os.getenv("PREFILTER", "true").lower() == "true"  # 選べない日を HTML だけで NO にする
+DEFAULT_HORIZON_WEEKS = 6
 DEFAULT_WEEKS_AHEAD = int(os.getenv("WEEKS_AHEAD", "2"))
 DEFAULT_TARGETS = [
     ("Mon", "20:00"),  # 月 20:00-21:30
@@ -39,19 +111,34 @@ DEFAULT_TARGETS = [
 ]
 DURATION_PREFERRED = "1,5 uur"
 
-MONTH_ABBR = ["jan", "feb", "mrt", "apr", "mei", "jun", "jul", "aug", "sep", "okt", "nov", "dec"]
 WD_IDX = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4, "Sat": 5, "Sun": 6}
+
+# 同一ホストへのリクエスト間隔（RATE_LIMIT 秒、slots.json "rate_limit" でホスト別に上書き）
+RATE_LIMITER = HostRateLimiter()
 # ---------------------------------------
 
 
 # ========= ユーティリティ =========
-def load_slots_json():
+def log(msg: str):
+    """診断は標準エラーへ（標準出力は result.txt として公開される）。"""
+    print(f"[LOG] {msg}", file=sys.stderr, flush=True)
+
+
+_RE_JSON_COMMENT = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*')
+
+
+def read_slots_json() -> dict:
+    """slots.json を dict で返す（無ければ {}）。行末の // コメントは読み飛ばす。"""
     cfg = Path("slots.json")
     if not cfg.exists():
-        return DEFAULT_WEEKS_AHEAD, DEFAULT_TARGETS
+        return {}
+    text = cfg.read_text(encoding="utf-8")
+    return json.loads(_RE_JSON_COMMENT.sub(lambda m: m.group(1) or "", text))
+
+
+def load_slots_json():
     try:
-        import json
-        data = json.loads(cfg.read_text(encoding="utf-8"))
+        data = read_slots_json()
         weeks = int(data.get("weeks_ahead", DEFAULT_WEEKS_AHEAD))
         targets = []
         for t in data.get("targets", []):
@@ -63,6 +150,70 @@ def load_slots_json():
         return DEFAULT_WEEKS_AHEAD, DEFAULT_TARGETS
 
 
+def load_concurrency() -> int:
+    """並列コンテキスト数。環境変数 CONCURRENCY > slots.json "concurrency" > 1。"""
+    env = os.getenv("CONCURRENCY")
+    try:
+        if env:
+            return max(1, int(env))
+        return max(1, int(read_slots_json().get("concurrency", 1)))
+    except Exception:
+        return 1
+
+
+def load_horizon_weeks() -> int:
+    """matrix モードの期間（週）。環境変数 HORIZON_WEEKS > slots.json "horizon_weeks" > 6。"""
+    try:
+        env = os.getenv("HORIZON_WEEKS")
+        return max(1, int(env or read_slots_json().get("horizon_weeks", DEFAULT_HORIZON_WEEKS)))
+    except Exception:
+        return DEFAULT_HORIZON_WEEKS
+
+
+def open_cache() -> AvailabilityCache | None:
+    """CACHE_TTL > slots.json "cache_ttl" > 既定。TTL 0 ならキャッシュしない。"""
+    try:
+        cfg = read_slots_json()
+    except Exception:
+        cfg = {}
+    try:
+        ttl = float(os.getenv("CACHE_TTL") or cfg.get("cache_ttl", DEFAULT_TTL))
+        max_entries = int(cfg.get("cache_max_entries", DEFAULT_MAX_ENTRIES))
+    except (TypeError, ValueError):
+        ttl, max_entries = DEFAULT_TTL, DEFAULT_MAX_ENTRIES
+    if ttl <= 0:
+        return None
+    return AvailabilityCache(CACHE_PATH, ttl=ttl, max_entries=max_entries)
+
+
+def accommodation_id(book_url: str) -> str:
+    m = re.search(r"/Book/(\d+)", book_url)
+    return m.group(1) if m else book_url
+
+
+def default_accommodation() -> dict:
+    """BOOK_URL + DURATION_PREFERRED の 1 施設（従来の動作）。"""
+    return {
+        "id": accommodation_id(BOOK_URL),
+        "url": BOOK_URL,
+        "name": "",
+        "duration": DURATION_PREFERRED,
+        "weeks_ahead": DEFAULT_WEEKS_AHEAD,
+        "targets": DEFAULT_TARGETS,
+    }
+
+
+def load_accommodation_list() -> list[dict]:
+    """slots.json の "accommodations"（無ければ従来の 1 施設）と rate_limit を読む。"""
+    weeks_ahead, base_targets = load_slots_json()
+    try:
+        cfg = read_slots_json()
+    except Exception:
+        cfg = {}
+    RATE_LIMITER.configure(cfg.get("rate_limit", {}))
+    return load_accommodations(cfg, BOOK_URL, DURATION_PREFERRED, weeks_ahead, base_targets)
+
+
 def next_weekday(base: datetime, weekday_idx: int, weeks_ahead: int) -> datetime:
     base = datetime(base.year, base.month, base.day)
     delta = (weekday_idx - base.weekday() + 7) % 7
@@ -70,12 +221,26 @@ def next_weekday(base: datetime, weekday_idx: int, weeks_ahead: int) -> datetime
     return base + timedelta(days=delta)
 
 
+CSV_HEADER = ["run_ts", "date", "weekday", "start", "available", "slot_label", "accommodation"]
+
+
 def ensure_csv_header(path: Path):
     if not path.exists():
         path.parent.mkdir(parents=True, exist_ok=True)
         with path.open("w", newline="", encoding="utf-8") as f:
             w = csv.writer(f)
-            w.writerow(["run_ts", "date", "weekday", "start", "available", "slot_label"])
+            w.writerow(CSV_HEADER)
+        return
+    # accommodation 列が無い古いファイルは 1 回だけ列を足して書き直す
+    with path.open(newline="", encoding="utf-8") as f:
+        old = list(csv.reader(f))
+    if old and "accommodation" not in old[0]:
+        accom = accommodation_id(BOOK_URL)
+        with path.open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(CSV_HEADER)
+            for r in old[1:]:
+                w.writerow(r + [accom])
 
 
 def append_csv(path: Path, rows: list[dict]):
@@ -84,230 +249,543 @@ def append_csv(path: Path, rows: list[dict]):
     with path.open("a", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         for r in rows:
-            w.writerow([ts, r["date"], r["weekday"], r["start"], r["available"], r["slot_label"]])
-
-
-# ========= 画面操作 =========
-def set_duration(page):
-    """1,5 uur が選べれば選択、無ければ 1 uur を選択。"""
-    page.wait_for_selector("select", timeout=20000)
-    sels = page.locator("select")
-    target = None
-    for i in range(sels.count()):
-        el = sels.nth(i)
-        if not el.is_visible():
-            continue
-        txt = (el.inner_text() or "").lower()
-        if ("1 uur" in txt or "1,5 uur" in txt) and "8 uur" in txt:
-            target = el
-            break
-    if not target:
-        return
-    txt = target.inner_text()
-    want = DURATION_PREFERRED if DURATION_PREFERRED in txt else "1 uur"
-    opts = target.locator("option")
-    for i in range(opts.count()):
-        opt = opts.nth(i)
-        if opt.inner_text().strip() == want:
-            target.select_option(opt.get_attribute("value") or want)
-            return
+            w.writerow([ts, r["date"], r["weekday"], r["start"], r["available"], r["slot_label"],
+                        r.get("accommodation", "")])
+
+
+def save_results(rows: list[dict]):
+    """RESULTS_STORE に応じて SQLite の区間ストア / results.csv に保存する。
+    ストアを初めて作るときは既存の results.csv を取り込んでおく。"""
+    if RESULTS_STORE in ("csv", "both"):
+        append_csv(RESULTS_CSV, rows)
+    if RESULTS_STORE in ("sqlite", "both"):
+        fresh = not RESULTS_DB.exists()
+        store = ResultsStore(RESULTS_DB)
+        try:
+            if fresh and RESULTS_CSV.exists() and RESULTS_STORE == "sqlite":
+                store.import_csv(RESULTS_CSV, accommodation_id(BOOK_URL))
+            store.record(rows, default_accommodation=accommodation_id(BOOK_URL))
+        finally:
+            store.close()
+
+
+def make_row(d: datetime, wd: str, hhmm: str, available: str, label: str,
+             accom_id: str | None = None, day_closed: bool = False) -> dict:
+    """day_closed はカレンダーでその日自体が選べなかったとき True（CSV/ストアには出さない）。"""
+    row = {
+        "date": d.strftime("%Y-%m-%d"),
+        "weekday": wd,
+        "start": hhmm,
+        "available": available,
+        "slot_label": label,
+        "accommodation": accom_id or accommodation_id(BOOK_URL),
+    }
+    if day_closed:
+        row["day_closed"] = True
+    return row
 
 
-def open_datepicker(page) -> bool:
-    """日付ピッカーを開く（複数の候補で試行）。"""
-    try:
-        el = page.get_by_label("Voor wanneer?")
-        el.click()
-        return True
-    except Exception:
-        pass
-    try:
-        page.locator(".ui-datepicker-trigger").first.click()
-        return True
-    except Exception:
-        pass
-    for sel in ["input.hasDatepicker", "input[id*='date']", "input[name*='date']"]:
+# ========= エンジン =========
+# 施設ごとの作業単位は (accom, targets)。accom は scheduler.load_accommodations の dict。
+def goto_with_retry(page, url: str, attempts: int = 3):
+    """画面遷移はリトライ。networkidle ではなく datepicker 初期化 + AJAX 完了を待つ。"""
+    last = None
+    for attempt in range(1, attempts + 1):
         try:
-            inp = page.locator(sel).first
-            if inp.count():
-                inp.click()
-                return True
-        except Exception:
-            continue
-    return False
-
+            with phase("goto", attempt=attempt, url=url):
+                goto_ready(page, url)
+            return
+        except Exception as e:
+            last = e
+    raise last
 
-def set_month_year_in_datepicker(page, d: datetime):
-    """datepicker の月/年セレクタに合わせる（0/1始まり・略称の両対応）。"""
-    month_sel = page.locator(".ui-datepicker select.ui-datepicker-month").first
-    year_sel = page.locator(".ui-datepicker select.ui-datepicker-year").first
 
-    if year_sel.count():
+def check_with_engine(engine: HttpEngine, targets: list[tuple], fetched: dict | None = None,
+                      accom: dict | None = None) -> list[dict]:
+    """bootstrap 済みの HttpEngine で判定する。日付ごとに POST 1 回。
+    fetched を渡すと {日付: 時刻ラベル一覧} を書き込む（キャッシュ用）。"""
+    accom = accom or default_accommodation()
+    results = []
+    labels_by_date = fetched if fetched is not None else {}
+    slots_by_date = {}
+    duration = engine.duration_value(accom["duration"])
+    for d, wd, hhmm in targets:
+        key = d.strftime("%Y-%m-%d")
+        if key not in labels_by_date and engine.day_index.blocked(d):
+            # カレンダーで選べない日（HTML の disabledDates / getclosed / minDate）は聞くまでもない
+            results.append(make_row(d, wd, hhmm, "NO", "", accom["id"], day_closed=True))
+            continue
+        if key not in slots_by_date:
+            if key in labels_by_date:
+                slots_by_date[key] = from_labels(labels_by_date[key])
+            else:
+                slots_by_date[key] = engine.fetch_slots(d, duration)
+                labels_by_date[key] = [s.label for s in slots_by_date[key]]
+        ok, label = match_slots(slots_by_date[key], hhmm, duration_minutes(accom["duration"]))
+        results.append(make_row(d, wd, hhmm, "YES" if ok else "NO", label, accom["id"]))
+    return results
+
+
+def check_groups_http(groups: list[tuple], fetched: dict | None = None) -> list[list[dict]]:
+    """ブラウザ無しで ShowAvailableTimeslots を直接叩く。全施設で 1 つのセッションを共有。"""
+    session = HttpSession(rate_limiter=RATE_LIMITER)
+    out = []
+    try:
+        for accom, targets in groups:
+            engine = HttpEngine(accom["url"], session=session)
+            engine.bootstrap()
+            sub = fetched.setdefault(accom["id"], {}) if fetched is not None else None
+            out.append(check_with_engine(engine, targets, sub, accom))
+    finally:
+        log(f"http engine: {session.requests_issued} request(s)")
+        session.close()
+    return out
+
+
+def prepare_page(page, accom: dict | None = None):
+    """Book ページを開いて所要時間を選び、datepicker を開いておく。"""
+    accom = accom or default_accommodation()
+    with phase("rate_wait", accom=accom["id"]):
+        RATE_LIMITER.wait(accom["url"])
+    goto_with_retry(page, accom["url"])
+
+    # 1) 所要時間選択（onchange で時刻一覧の AJAX が飛ぶので完了を待つ）
+    with phase("set_duration", accom=accom["id"]):
+        set_duration(page, accom["duration"])
+        wait_ajax_idle(page)
+
+    # 2) datepicker を開く（表示されなければもう 1 回）
+    with phase("open_datepicker", accom=accom["id"]):
+        if not (open_datepicker(page) and wait_datepicker_visible(page)):
+            open_datepicker(page)
+            wait_datepicker_visible(page, timeout=12000)
+
+
+def screenshot_name(d: datetime, wd: str, hhmm: str, accom_id: str) -> str:
+    """証跡のファイル名（拡張子なし。EvidenceWriter が形式に合わせて付ける）。"""
+    name = f"{d.strftime('%Y%m%d')}_{wd}_{hhmm.replace(':','')}"
+    # 既定の施設は従来のファイル名のまま
+    return name if accom_id == accommodation_id(BOOK_URL) else f"{accom_id}_{name}"
+
+
+def check_on_page(page, targets: list[tuple], fetched: dict | None = None,
+                  accom: dict | None = None) -> list[dict]:
+    """準備済みのページで各日付の可否を判定する（watch.py からも使う）。"""
+    accom = accom or default_accommodation()
+    # 同じ月の対象をまとめて回す（結果は targets の順で返す）
+    order = [i for group in month_groups([t[0] for t in targets]) for i in group]
+    results: list[dict | None] = [None] * len(targets)
+    for i in order:
+        d, wd, hhmm = targets[i]
+        tags = {"accom": accom["id"], "date": d, "start": hhmm}
         try:
-            year_sel.select_option(str(d.year), force=True)
-        except Exception:
-            pass
-
-    if month_sel.count():
-        for val in (str(d.month - 1), str(d.month)):
+            # 日付クリックでピッカーが閉じるので、閉じていれば開き直す
+            if not page.locator(".ui-datepicker").first.is_visible():
+                with phase("open_datepicker", **tags):
+                    open_datepicker(page)
+                    wait_datepicker_visible(page)
+            with phase("month_switch", **tags):
+                set_month_year_in_datepicker(page, d)
+                wait_month_shown(page, d)
+            # 日付クリックで ShowAvailableTimeslots が 1 回飛ぶ → その応答を待つ
+            with phase("rate_wait", **tags):
+                RATE_LIMITER.wait(accom["url"])
+            with phase("day_click", **tags):
+                clicked = click_and_wait_timeslots(page, lambda: click_day_in_calendar(page, d.day))
+
+            with phase("read_times", **tags):
+                slots = read_time_slots(page) if clicked else []
+            ok, label = match_slots(slots, hhmm, duration_minutes(accom["duration"]))
+            # クリックできずに select を読んでいない日はキャッシュしない（TTL の間ずっと NO になる）
+            if fetched is not None and clicked:
+                fetched[d.strftime("%Y-%m-%d")] = [s.label for s in slots]
+
+            results[i] = make_row(d, wd, hhmm, "YES" if ok else "NO", label, accom["id"],
+                                  day_closed=not clicked)
+
+            if ok and EVIDENCE.enabled:
+                with phase("evidence", **tags):
+                    EVIDENCE.capture(page, screenshot_name(d, wd, hhmm, accom["id"]), results[i])
+
+        except Exception as e:
+            # 1件失敗しても続行（証跡の失敗では判定を ERROR にしない）
+            if results[i] is None:
+                results[i] = make_row(d, wd, hhmm, "ERROR", str(e)[:120], accom["id"])
             try:
-                month_sel.select_option(val, force=True)
-                return
+                with phase("reload", **tags):
+                    reload_ready(page)
+                    set_duration(page, accom["duration"])
             except Exception:
                 pass
-        want = MONTH_ABBR[d.month - 1]
-        opts = month_sel.locator("option")
-        for i in range(opts.count()):
-            t = opts.nth(i).inner_text().strip().lower()
-            v = (opts.nth(i).get_attribute("value") or "").lower()
-            if t == want or v == want:
-                month_sel.select_option(opts.nth(i).get_attribute("value") or t, force=True)
-                return
+    return results
+
+
+def check_groups_playwright(groups: list[tuple], fetched: dict | None = None) -> list[list[dict]]:
+    """ブラウザ 1 つで施設ごとにページを開いて順にチェックする。"""
+    from playwright.sync_api import sync_playwright
 
+    import browser_profile
 
-def click_day_in_calendar(page, day: int) -> bool:
-    cal = page.locator(".ui-datepicker .ui-datepicker-calendar")
-    if not cal.count():
-        return False
-    links = cal.locator("a.ui-state-default")
-    for i in range(links.count()):
-        if links.nth(i).inner_text().strip() == str(day):
+    out = []
+    with sync_playwright() as p:
+        with phase("launch"):
+            browser, context = browser_profile.launch(p, HEADLESS)
+
+        # 解析用トレース（TRACE_MODE、既定は ERROR の出た施設分だけ traces/ に保存）
+        tracer = TraceRecorder(context)
+        context.set_default_timeout(30000)  # 30s
+        if blocking_enabled(EVIDENCE.pixels):
+            install_resource_filter(context, [accom["url"] for accom, _ in groups], keep_css=EVIDENCE.pixels)
+
+        try:
+            for accom, targets in groups:
+                tracer.begin()
+                page = context.new_page()
+                rows = None
+                try:
+                    prepare_page(page, accom)
+
+                    # 3) それぞれの日付で可否判定
+                    sub = fetched.setdefault(accom["id"], {}) if fetched is not None else None
+                    rows = check_on_page(page, targets, sub, accom)
+                except Exception as e:
+                    rows = [make_row(d, wd, hhmm, "ERROR", str(e)[:120], accom["id"]) for d, wd, hhmm in targets]
+                finally:
+                    saved = tracer.end(accom["id"], rows is None or has_error(rows))
+                    if saved:
+                        log(f"trace saved: {saved}")
+                    page.close()
+                out.append(rows)
+
+        finally:
+            tracer.close()
+            browser_profile.close(browser, context)
+
+    return out
+
+
+def check_groups_pool(groups: list[tuple], concurrency: int,
+                      fetched: dict | None = None) -> list[list[dict]]:
+    """コンテキスト N 個で全施設の対象をまとめて並列チェック。結果は groups と同じ順。"""
+    from concurrent_check import check_jobs
+
+    jobs = [(d, wd, hhmm, accom["url"], accom["duration"])
+            for accom, targets in groups for d, wd, hhmm in targets]
+    res = iter(check_jobs(jobs, concurrency, headless=HEADLESS,
+                          evidence=EVIDENCE if EVIDENCE.enabled else None,
+                          rate_limiter=RATE_LIMITER, default_url=BOOK_URL,
+                          block_resources=blocking_enabled(EVIDENCE.pixels), trace_mode=TRACE_MODE))
+    out = []
+    for accom, targets in groups:
+        rows = []
+        for d, wd, hhmm in targets:
+            avail, label, labels = next(res)
+            if fetched is not None and labels is not None:
+                fetched.setdefault(accom["id"], {})[d.strftime("%Y-%m-%d")] = labels
+            # 日付を選べなかった対象は順次版と同じく day_closed（AdaptivePoller のバックオフ用）
+            rows.append(make_row(d, wd, hhmm, avail, label, accom["id"],
+                                 day_closed=avail == "NO" and labels is None))
+        out.append(rows)
+    return out
+
+
+def check_live(groups: list[tuple], fetched: dict | None = None) -> list[list[dict]]:
+    """設定に応じたエンジンでサイトに問い合わせる。
+    fetched を渡すと {施設 id: {日付: 時刻ラベル一覧}} を書き込む。"""
+    if ENGINE == "http":
+        try:
+            return check_groups_http(groups, fetched)
+        except (HttpEngineError, OSError) as e:
+            # エンドポイントの仕様変更などはブラウザ経由で救う
+            log(f"http engine failed ({e}); falling back to playwright")
+            if fetched is not None:
+                fetched.clear()
+    concurrency = load_concurrency()
+    if concurrency > 1:
+        return check_groups_pool(groups, concurrency, fetched)
+    return check_groups_playwright(groups, fetched)
+
+
+def prefilter_stale(plan: list[tuple], rows: list[list], stale: list[tuple]) -> list[tuple]:
+    """ブラウザを起動する前に Book ページの HTML を 1 回ずつ GET し、
+    カレンダーで選べない日（day_index.py）の対象を NO で埋める。残りの stale を返す。"""
+    session = HttpSession(rate_limiter=RATE_LIMITER)
+    remaining, closed = [], 0
+    try:
+        for gi, idx in stale:
+            accom, targets = plan[gi]
             try:
-                links.nth(i).click()
-                return True
-            except Exception:
-                pass
-    return False
-
-
-def time_has_start(page, start_hhmm: str) -> tuple[bool, str]:
-    """『Welke tijd』のセレクトから指定開始時刻オプションの有無を確認。"""
-    sels = page.locator("select")
-    time_sel = None
-    for i in range(sels.count()):
-        el = sels.nth(i)
-        if ":" in (el.inner_text() or ""):
-            time_sel = el
-            break
-    if not time_sel:
-        return False, ""
-    opts = time_sel.locator("option")
-    for i in range(opts.count()):
-        t = opts.nth(i).inner_text().strip()  # "20:00 - 21:30"
-        if t.startswith(start_hhmm):
-            return True, t
-    return False, ""
+                with phase("prefilter", accom=accom["id"]):
+                    index = fetch_day_index(session, accom["url"])
+            except (HttpEngineError, OSError) as e:
+                log(f"prefilter {accom['id']} skipped ({e})")
+                remaining.append((gi, idx))
+                continue
+            keep = []
+            for ti in idx:
+                d, wd, hhmm = targets[ti]
+                if index.blocked(d):
+                    rows[gi][ti] = make_row(d, wd, hhmm, "NO", "", accom["id"], day_closed=True)
+                    closed += 1
+                else:
+                    keep.append(ti)
+            if keep:
+                remaining.append((gi, keep))
+    finally:
+        session.close()
+    log(f"prefilter: {closed} closed day(s) resolved without the browser "
+        f"({session.requests_issued} request(s))")
+    return remaining
+
+
+def check_all(accommodations: list[dict], max_age: float | None = None) -> list[dict]:
+    """全施設の対象を計画し、キャッシュが新しい日付はそのまま判定、
+    古い/無い日付だけ check_live に回す（ブラウザ/HTTP セッションは 1 回分だけ起動）。"""
+    plan = [(accom, build_targets(accom["weeks_ahead"], accom["targets"])) for accom in accommodations]
+    rows: list[list[dict | None]] = [[None] * len(targets) for _, targets in plan]
+    stale: list[tuple] = []  # (plan index, [target index, ...])
+    cache = open_cache()
+    try:
+        if cache is not None:
+            cache.purge_past(datetime.now().strftime("%Y-%m-%d"))
+        hits = misses = 0
+        for gi, (accom, targets) in enumerate(plan):
+            idx = []
+            for ti, (d, wd, hhmm) in enumerate(targets):
+                labels = None
+                if cache is not None:
+                    labels = cache.get(accom["id"], d.strftime("%Y-%m-%d"), accom["duration"], max_age)
+                if labels is None:
+                    idx.append(ti)
+                    continue
+                ok, label = match_start(labels, hhmm, duration_minutes(accom["duration"]))
+                rows[gi][ti] = make_row(d, wd, hhmm, "YES" if ok else "NO", label, accom["id"])
+            hits += len(targets) - len(idx)
+            misses += len(idx)
+            if idx:
+                stale.append((gi, idx))
+        if cache is not None:
+            log(f"cache: {hits} hit / {misses} stale")
+
+        if stale and PREFILTER and ENGINE != "http":
+            stale = prefilter_stale(plan, rows, stale)
+        if stale:
+            fetched: dict[str, dict[str, list[str]]] = {}
+            groups = [(plan[gi][0], [plan[gi][1][ti] for ti in idx]) for gi, idx in stale]
+            for (gi, idx), live in zip(stale, check_live(groups, fetched)):
+                for ti, row in zip(idx, live):
+                    rows[gi][ti] = row
+            if cache is not None:
+                for accom, _ in groups:
+                    for date_iso, labels in fetched.get(accom["id"], {}).items():
+                        cache.put(accom["id"], date_iso, accom["duration"], labels)
+        return [r for group in rows for r in group]
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def print_results(results: list[dict]):
+    multi = len({r.get("accommodation") for r in results}) > 1
+    for r in results:
+        if r["available"] == "YES":
+            status = "Available ✅"
+        elif r["available"] == "NO":
+            status = "Not available ❌"
+        else:
+            status = f"ERROR ⚠️"
+        extra = f" [{r['slot_label']}]" if r["slot_label"] else ""
+        hall = f"#{r['accommodation']} " if multi else ""
+        print(f"{hall}{r['date']} ({r['weekday']}) {r['start']} → {status}{extra}")
 
 
 # ========= メイン =========
-def main():
-    weeks_ahead, base_targets = load_slots_json()
-
-    # チェック対象の日付リスト作成
+def build_targets(weeks_ahead: int, base_targets: list[tuple]) -> list[tuple]:
     today = datetime.now()
     targets = []
     for wd, hhmm in base_targets:
         d = next_weekday(today, WD_IDX[wd], weeks_ahead)
         targets.append((d, wd, hhmm))
+    return targets
 
-    results = []
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=HEADLESS)
+def read_horizon_labels(accom: dict, dates: list[datetime]) -> dict[str, list[str] | None]:
+    """dates の時刻ラベル一覧をまとめて取る（matrix / series 共通）。選べない日は None。
+    ENGINE=http なら日付ごとに POST、失敗したらブラウザで月ごとにカレンダーを 1 回読む。"""
+    from matrix_mode import read_labels_playwright, read_labels_http
 
-        # 解析用トレース
-        context = browser.new_context()
-        context.tracing.start(screenshots=True, snapshots=True, sources=True)
-        page = context.new_page()
-        page.set_default_timeout(30000)  # 30s
+    if ENGINE == "http":
+        engine = HttpEngine(accom["url"], session=HttpSession(rate_limiter=RATE_LIMITER))
+        try:
+            engine.bootstrap()
+            return read_labels_http(engine, dates, engine.duration_value(accom["duration"]))
+        except (HttpEngineError, OSError) as e:
+            log(f"http engine failed ({e}); falling back to playwright")
+        finally:
+            engine.close()
 
-        # 画面遷移はリトライ
-        def goto_with_retry(url: str, attempts: int = 3):
-            last = None
-            for _ in range(attempts):
-                try:
-                    page.goto(url, wait_until="networkidle", timeout=45000)
-                    return
-                except Exception as e:
-                    last = e
-                    page.wait_for_timeout(1500)
-            raise last
+    from playwright.sync_api import sync_playwright
+
+    import browser_profile
 
+    with sync_playwright() as p:
+        with phase("launch"):
+            browser, context = browser_profile.launch(p, HEADLESS)
+        # matrix / series はスクリーンショットを撮らない
+        if blocking_enabled(False):
+            install_resource_filter(context, [accom["url"]])
+        page = context.new_page()
+        page.set_default_timeout(30000)
         try:
-            goto_with_retry(BOOK_URL)
+            goto_with_retry(page, accom["url"])
+            with phase("set_duration", accom=accom["id"]):
+                set_duration(page, accom["duration"])
+            return read_labels_playwright(page, dates)
+        finally:
+            browser_profile.close(browser, context)
 
-            # 1) 所要時間選択
-            set_duration(page)
 
-            # 2) datepicker を開く（再試行あり）
-            opened = open_datepicker(page)
-            if not opened:
-                page.wait_for_timeout(700)
-                opened = open_datepicker(page)
-            if opened:
-                try:
-                    page.wait_for_selector(".ui-datepicker", timeout=12000)
-                except Exception:
-                    pass
+def run_matrix(accom: dict, suffix: str = ""):
+    """MODE=matrix: 月ごとに 1 回カレンダーを読んで horizon 全体の表を作る。"""
+    from matrix_mode import (
+        MATRIX_CSV, MATRIX_JSON,
+        horizon_dates, starts_by_weekday, build_grid, write_matrix, print_matrix,
+    )
 
-            # 3) それぞれの日付で可否判定
-            for d, wd, hhmm in targets:
-                try:
-                    set_month_year_in_datepicker(page, d)
-                    page.wait_for_timeout(300)
-                    clicked = click_day_in_calendar(page, d.day)
-
-                    ok, label = (False, "")
-                    if clicked:
-                        ok, label = time_has_start(page, hhmm)
-
-                    results.append({
-                        "date": d.strftime("%Y-%m-%d"),
-                        "weekday": wd,
-                        "start": hhmm,
-                        "available": "YES" if ok else "NO",
-                        "slot_label": label,
-                    })
-
-                    if ok:
-                        SCREENSHOT_DIR.mkdir(exist_ok=True)
-                        name = f"{d.strftime('%Y%m%d')}_{wd}_{hhmm.replace(':','')}.png"
-                        page.screenshot(path=str(SCREENSHOT_DIR / name), full_page=True)
+    starts = starts_by_weekday(accom["targets"])
+    dates = horizon_dates(datetime.now(), load_horizon_weeks(), set(starts))
+    labels = read_horizon_labels(accom, dates)
 
-                except Exception as e:
-                    # 1件失敗しても続行
-                    results.append({
-                        "date": d.strftime("%Y-%m-%d"),
-                        "weekday": wd,
-                        "start": hhmm,
-                        "available": "ERROR",
-                        "slot_label": str(e)[:120],
-                    })
-                    try:
-                        page.reload(wait_until="networkidle")
-                    except Exception:
-                        pass
+    columns, rows = build_grid(dates, starts, labels, duration_minutes(accom["duration"]))
+    print_matrix(columns, rows)
+    write_matrix(columns, rows,
+                 MATRIX_CSV.with_stem(MATRIX_CSV.stem + suffix),
+                 MATRIX_JSON.with_stem(MATRIX_JSON.stem + suffix))
 
-        finally:
-            # トレース保存（失敗時の解析用）
-            try:
-                context.tracing.stop(path="trace.zip")
-            except Exception:
-                pass
-            browser.close()
 
-    # 出力
-    for r in results:
-        if r["available"] == "YES":
-            status = "Available ✅"
-        elif r["available"] == "NO":
-            status = "Not available ❌"
-        else:
-            status = f"ERROR ⚠️"
-        extra = f" [{r['slot_label']}]" if r["slot_label"] else ""
-        print(f"{r['date']} ({r['weekday']}) {r['start']} → {status}{extra}")
+def load_series_until() -> datetime:
+    """series モードの終了日。SERIES_UNTIL > slots.json "series_until" > 次の 6/30。"""
+    from series_mode import default_until
+
+    try:
+        value = os.getenv("SERIES_UNTIL") or read_slots_json().get("series_until")
+        if value:
+            return datetime.strptime(value, "%Y-%m-%d")
+    except Exception:
+        pass
+    return default_until(datetime.now())
+
+
+def run_series(accom: dict, suffix: str = ""):
+    """MODE=series: 各対象を終了日まで毎週に展開し、まとめて取得して連続で取れる区間を出す。"""
+    from series_mode import SERIES_JSON, series_dates, build_series, print_series, write_series
+
+    until = load_series_until()
+    today = datetime.now()
+    dates_by_target = {(wd, hhmm): series_dates(today, wd, until) for wd, hhmm in accom["targets"]}
+    dates = sorted({d for ds in dates_by_target.values() for d in ds})
+    labels = read_horizon_labels(accom, dates) if dates else {}
+
+    series = build_series(accom["targets"], dates_by_target, labels, duration_minutes(accom["duration"]))
+    print_series(series, until)
+    write_series(series, until, SERIES_JSON.with_stem(SERIES_JSON.stem + suffix))
+
+
+def run_search_mode(accommodations: list[dict]):
+    """MODE=search: 施設を指定せずに対象ごとに空いている施設を探す（ブラウザ無し）。
+    全施設の対象を合わせ（同じ日・開始時刻は 1 回）、所要時間ごとに検索する。"""
+    from search_mode import DEFAULT_ACTIVITY, run_search, print_search, write_search
+
+    try:
+        activity = str(read_slots_json().get("search", {}).get("activity", DEFAULT_ACTIVITY))
+    except Exception:
+        activity = DEFAULT_ACTIVITY
+    by_duration: dict[str, set[tuple]] = {}
+    for accom in accommodations:
+        by_duration.setdefault(accom["duration"], set()).update(
+            build_targets(accom["weeks_ahead"], accom["targets"]))
+    rows = []
+    for duration, targets in by_duration.items():
+        # 検索フォームはどの Book ページにもあるので、最初の施設のページから聞く
+        found = run_search(accommodations[0]["url"], sorted(targets, key=lambda t: (t[0], t[2])),
+                           duration, activity, RATE_LIMITER)
+        rows += [dict(r, duration=duration) for r in found]
+    print_search(rows)
+    write_search(rows)
+
+
+def load_sweep_durations() -> list[str] | None:
+    """sweep モードで調べる所要時間。SWEEP_DURATIONS > slots.json "sweep_durations" > 全部（None）。"""
+    from sweep_mode import parse_duration_list
+
+    env = os.getenv("SWEEP_DURATIONS")
+    if env:
+        return parse_duration_list(env) or None
+    try:
+        return list(read_slots_json().get("sweep_durations", [])) or None
+    except Exception:
+        return None
+
+
+def run_sweep_mode(accom: dict, suffix: str = ""):
+    """MODE=sweep: Book ページ 1 回で所要時間ごとの時刻一覧を並列に取り、日付ごとの表を出す。"""
+    from matrix_mode import horizon_dates, starts_by_weekday
+    from sweep_mode import SWEEP_CSV, SWEEP_JSON, run_sweep, print_sweep, write_sweep
+
+    starts = starts_by_weekday(accom["targets"])
+    dates = horizon_dates(datetime.now(), load_horizon_weeks(), set(starts))
+    engine = HttpEngine(accom["url"], session=HttpSession(rate_limiter=RATE_LIMITER))
+    try:
+        engine.bootstrap()
+        durations, rows = run_sweep(engine, dates, starts, load_sweep_durations())
+    except (HttpEngineError, OSError) as e:
+        log(f"sweep failed for #{accom['id']} ({e})")
+        return
+    finally:
+        engine.close()
+    print_sweep(durations, starts, rows)
+    write_sweep(durations, starts, rows,
+                SWEEP_CSV.with_stem(SWEEP_CSV.stem + suffix),
+                SWEEP_JSON.with_stem(SWEEP_JSON.stem + suffix))
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Uithoorn court availability checker")
+    ap.add_argument("--max-age", type=float, default=None,
+                    help="この秒数より古いキャッシュは取り直す（0 で全件取り直し）")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    accommodations = load_accommodation_list()
+    try:
+        with phase("total", mode=MODE, engine=ENGINE):
+            if MODE == "matrix":
+                for accom in accommodations:
+                    run_matrix(accom, f"_{accom['id']}" if len(accommodations) > 1 else "")
+                return
+            if MODE == "series":
+                for accom in accommodations:
+                    run_series(accom, f"_{accom['id']}" if len(accommodations) > 1 else "")
+                return
+            if MODE == "sweep":
+                for accom in accommodations:
+                    run_sweep_mode(accom, f"_{accom['id']}" if len(accommodations) > 1 else "")
+                return
+            if MODE == "search":
+                run_search_mode(accommodations)
+                return
+
+            # チェック対象の日付リスト作成 → 施設をまたいでまとめて判定
+            results = check_all(accommodations, args.max_age)
 
-    append_csv(RESULTS_CSV, results)
+        # 出力
+        print_results(results)
+        save_results(results)
+    finally:
+        EVIDENCE.close()  # 別スレッドの書き込みを待つ
+        timing.report()
 
 
 if __name__ == "__main__":
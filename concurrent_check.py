@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+ブラウザ 1 つ + 独立したコンテキスト N 個で対象日を並列にチェックする（async Playwright）。
+- 各ワーカーが自分のコンテキストで Book ページを開き、所要時間・datepicker を準備
+- 共有キューから「施設 × 月」ごとの対象のまとまりを取り出して順に判定
+  （月を行き来してカレンダーを描き直さずに済む。別の月は別のコンテキストで並列に進む。
+   まとまりがワーカー数より少なければ、大きいものを半分に割って全員に仕事を回す）
+  （複数施設が混ざっていても、URL が変わったときだけページを開き直す）
+- 結果は index 位置に書き戻すので、呼び出し側の出力順は対象リストの順のまま
+- 読んだ時刻ラベル一覧も一緒に返す（キャッシュ用、エラー時は None）
+- trace_mode（trace_capture.TRACE_MODE）を渡すとコンテキストごとにトレースを取り、
+  ERROR の出たまとまりだけ traces/trace-…-<施設id>-YYYYMM.zip に残す
+
+5 件なら実質ページ 1 回分の待ち時間で終わる。
+"""
+
+import asyncio
+from datetime import datetime
+
+from playwright.async_api import async_playwright
+
+import browser_profile
+from dom_extract import (
+    async_snapshot_selects,
+    async_snapshot_calendar,
+    find_duration_select,
+    find_time_select,
+    option_value,
+    select_labels,
+    month_option_value,
+    day_link_index,
+    select_locator,
+)
+from timeslots import duration_minutes, match_start
+from readiness import (
+    async_goto_ready,
+    async_wait_ajax_idle,
+    async_wait_datepicker_visible,
+    async_wait_month_shown,
+    async_click_and_wait_timeslots,
+)
+from resource_filter import async_install as async_install_resource_filter
+from timing import phase
+from trace_capture import AsyncTraceRecorder, log
+
+
+# ========= 画面操作（book_page.py の async 版） =========
+async def set_duration(page, preferred: str):
+    await page.wait_for_selector("select", timeout=20000)
+    target = find_duration_select(await async_snapshot_selects(page))
+    if not target:
+        return
+    want = preferred if preferred in target["text"] else "1 uur"
+    value = option_value(target, want)
+    if value is not None:
+        await select_locator(page, target).select_option(value)
+
+
+async def open_datepicker(page) -> bool:
+    try:
+        await page.get_by_label("Voor wanneer?").click()
+        return True
+    except Exception:
+        pass
+    try:
+        await page.locator(".ui-datepicker-trigger").first.click()
+        return True
+    except Exception:
+        pass
+    for sel in ["input.hasDatepicker", "input[id*='date']", "input[name*='date']"]:
+        try:
+            inp = page.locator(sel).first
+            if await inp.count():
+                await inp.click()
+                return True
+        except Exception:
+            continue
+    return False
+
+
+async def set_month_year_in_datepicker(page, d: datetime):
+    cal = await async_snapshot_calendar(page)
+    if not cal:
+        return
+    if cal["year_options"] and cal["year"] != str(d.year):
+        try:
+            await page.locator(".ui-datepicker select.ui-datepicker-year").first.select_option(str(d.year), force=True)
+            cal = await async_snapshot_calendar(page) or cal
+        except Exception:
+            pass
+    if cal["month_options"]:
+        val = month_option_value(cal["month_options"], d)
+        if val is not None and val != cal["month"]:
+            await page.locator(".ui-datepicker select.ui-datepicker-month").first.select_option(val, force=True)
+
+
+async def click_day_in_calendar(page, day: int) -> bool:
+    idx = day_link_index(await async_snapshot_calendar(page), day)
+    if idx < 0:
+        return False
+    try:
+        await page.locator(".ui-datepicker .ui-datepicker-calendar a.ui-state-default").nth(idx).click()
+        return True
+    except Exception:
+        return False
+
+
+async def read_time_labels(page) -> list[str]:
+    return select_labels(find_time_select(await async_snapshot_selects(page)))
+
+
+# ========= ワーカー =========
+async def _prepare(page, book_url: str, preferred: str):
+    for attempt in range(3):
+        try:
+            with phase("goto", attempt=attempt + 1, url=book_url):
+                await async_goto_ready(page, book_url)
+            break
+        except Exception:
+            if attempt == 2:
+                raise
+    with phase("set_duration", url=book_url):
+        await set_duration(page, preferred)
+        await async_wait_ajax_idle(page)
+    with phase("open_datepicker", url=book_url):
+        if not (await open_datepicker(page) and await async_wait_datepicker_visible(page)):
+            await open_datepicker(page)
+            await async_wait_datepicker_visible(page, timeout=12000)
+
+
+def plan_batches(jobs: list[tuple], concurrency: int) -> list[list[tuple]]:
+    """jobs を「施設（URL・所要時間）× 月」のまとまりに分ける。各要素は (index,) + job。
+    まとまりが concurrency より少なければ、大きいものから半分に割る。"""
+    groups: dict[tuple, list[tuple]] = {}
+    for i in sorted(range(len(jobs)), key=lambda i: (jobs[i][3], jobs[i][0])):
+        d, _, _, url, duration = jobs[i]
+        groups.setdefault((url, duration, d.year, d.month), []).append((i,) + tuple(jobs[i]))
+    batches = list(groups.values())
+    while len(batches) < concurrency:
+        big = max(range(len(batches)), key=lambda b: len(batches[b]), default=None)
+        if big is None or len(batches[big]) < 2:
+            break
+        half = len(batches[big]) // 2
+        batches[big:big + 1] = [batches[big][:half], batches[big][half:]]
+    return batches
+
+
+def _batch_name(batch: list[tuple]) -> str:
+    """トレースの名前（<施設id>-YYYYMM）。"""
+    _, d, _, _, book_url, _ = batch[0]
+    return f"{book_url.rstrip('/').rsplit('/', 1)[-1]}-{d:%Y%m}"
+
+
+async def _worker(browser, queue: asyncio.Queue, out: list, evidence=None,
+                  rate_limiter=None, default_url: str | None = None, block_urls: list[str] | None = None,
+                  trace_mode: str = "off"):
+    context = await browser.new_context()
+    tracer = AsyncTraceRecorder(context, trace_mode)
+    await tracer.start()
+    if block_urls:
+        # 画像の証跡を撮るなら CSS だけは通す（画像・フォント等は止めたまま）
+        await async_install_resource_filter(context, block_urls, keep_css=bool(evidence and evidence.pixels))
+    page = await context.new_page()
+    page.set_default_timeout(30000)
+    try:
+        prepared = None  # 今開いている (url, duration)
+        while True:
+            try:
+                batch = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await tracer.begin()
+            prepared = await _run_batch(page, batch, out, prepared, evidence, rate_limiter, default_url)
+            saved = await tracer.end(_batch_name(batch), any(out[job[0]][0] == "ERROR" for job in batch))
+            if saved:
+                log(f"trace saved: {saved}")
+    finally:
+        await tracer.close()
+        await context.close()
+
+
+async def _run_batch(page, batch: list[tuple], out: list, prepared, evidence=None,
+                     rate_limiter=None, default_url: str | None = None):
+    """同じ施設・同じ月の対象を順に判定し、今開いている (url, duration) を返す。"""
+    for idx, d, wd, hhmm, book_url, preferred in batch:
+        tags = {"url": book_url, "date": d, "start": hhmm}
+        try:
+            if prepared != (book_url, preferred):
+                if rate_limiter:
+                    with phase("rate_wait", **tags):
+                        await asyncio.sleep(rate_limiter.reserve(book_url))
+                await _prepare(page, book_url, preferred)
+                prepared = (book_url, preferred)
+            elif not await page.locator(".ui-datepicker").first.is_visible():
+                with phase("open_datepicker", **tags):
+                    await open_datepicker(page)
+                    await async_wait_datepicker_visible(page)
+            with phase("month_switch", **tags):
+                await set_month_year_in_datepicker(page, d)
+                await async_wait_month_shown(page, d)
+            if rate_limiter:
+                with phase("rate_wait", **tags):
+                    await asyncio.sleep(rate_limiter.reserve(book_url))
+            labels = None  # 日付をクリックできなかった（その日は選べない）
+            with phase("day_click", **tags):
+                clicked = await async_click_and_wait_timeslots(page, lambda: click_day_in_calendar(page, d.day))
+            if clicked:
+                with phase("read_times", **tags):
+                    labels = await read_time_labels(page)
+            ok, label = match_start(labels or [], hhmm, duration_minutes(preferred))
+            out[idx] = ("YES" if ok else "NO", label, labels)
+            if ok and evidence:
+                name = f"{d.strftime('%Y%m%d')}_{wd}_{hhmm.replace(':', '')}"
+                if default_url and book_url != default_url:
+                    name = f"{book_url.rstrip('/').rsplit('/', 1)[-1]}_{name}"
+                row = {"date": d.strftime("%Y-%m-%d"), "weekday": wd, "start": hhmm,
+                       "available": "YES", "slot_label": label, "url": book_url}
+                with phase("evidence", **tags):
+                    await evidence.async_capture(page, name, row)
+        except Exception as e:
+            if out[idx][0] == "ERROR":  # 証跡の失敗では判定を ERROR にしない
+                out[idx] = ("ERROR", str(e)[:120], None)
+            # 次の対象はページを開き直してから
+            prepared = None
+    return prepared
+
+
+async def check_jobs_async(jobs: list[tuple], concurrency: int, headless: bool = True,
+                           evidence=None, rate_limiter=None,
+                           default_url: str | None = None, block_resources: bool = False,
+                           trace_mode: str = "off") -> list[tuple]:
+    """jobs [(date, weekday, start, url, duration), ...] と同じ順で [(available, label, labels), ...] を返す。
+    日付をクリックできなかった（カレンダーで選べない）対象は ("NO", "", None)。
+    証跡（evidence.EvidenceWriter）の名前は default_url 以外の施設だけ id を頭に付ける。
+    block_resources=True なら画像・フォント・CSS 等を読み込まない（resource_filter.py、画像の証跡を撮るなら CSS は通す）。
+    trace_mode は trace_capture.TraceRecorder と同じ（off / on-failure / always）。"""
+    batches = plan_batches(jobs, concurrency)
+    queue: asyncio.Queue = asyncio.Queue()
+    for batch in batches:
+        queue.put_nowait(batch)
+    out: list = [("ERROR", "not checked", None)] * len(jobs)
+    n = max(1, min(concurrency, len(batches)))
+    block_urls = sorted({j[3] for j in jobs}) if block_resources else None
+
+    async with async_playwright() as p:
+        with phase("launch", concurrency=n):
+            # BROWSER_ENDPOINT があれば共有の Chromium に繋ぐ（close() は切断だけ）
+            browser = await browser_profile.async_launch(p, headless)
+        try:
+            await asyncio.gather(*[
+                _worker(browser, queue, out, evidence, rate_limiter, default_url, block_urls, trace_mode)
+                for _ in range(n)
+            ])
+        finally:
+            await browser.close()
+    return out
+
+
+def check_jobs(jobs: list[tuple], concurrency: int, headless: bool = True,
+               evidence=None, rate_limiter=None,
+               default_url: str | None = None, block_resources: bool = False,
+               trace_mode: str = "off") -> list[tuple]:
+    """同期コードから呼ぶための入口（複数施設）。"""
+    return asyncio.run(check_jobs_async(jobs, concurrency, headless, evidence,
+                                        rate_limiter, default_url, block_resources, trace_mode))
+
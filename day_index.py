@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Book ページの HTML に直書きされている「選べない日」をブラウザ無しで読む。
+
+  function IsAvailableDate(date) { var disabledDates = "20-9-2025,21-9-2025"; ... }
+  function getclosed(day) { switch (day) { case 0: return false; ... } }   // day は JS の getDay（0=日）
+  $("#datepicker").datepicker({ ... minDate: "+1D", ... })
+
+datepicker の beforeShowDay と同じ条件（休館曜日・disabledDates・minDate より前）の日は
+時刻一覧を取りに行かなくても NO と分かる。HTML 1 回の GET で集合にしておき、日付は集合で引く。
+（カレンダーを開いて read_month_availability で選択可の日を読むのと同じ結果）
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+_RE_DISABLED = re.compile(r'var\s+disabledDates\s*=\s*"([^"]*)"')
+_RE_GETCLOSED = re.compile(r"function\s+getclosed\s*\(\s*\w+\s*\)\s*\{(.*?)\n\s*\}\s*\n", re.S)
+_RE_CASE = re.compile(r"case\s+(\d)\s*:\s*return\s+(true|false)")
+_RE_MIN_DATE = re.compile(r'minDate\s*:\s*"\+(\d+)D"')
+
+
+class DayIndex:
+    """選べない日の集合。blocked(d) が理由を返せばその日は NO。"""
+
+    def __init__(self, disabled: set[date] | None = None, closed_weekdays: set[int] | None = None,
+                 min_days: int = 0, today: date | None = None):
+        self.disabled = disabled or set()
+        self.closed_weekdays = closed_weekdays or set()  # Python の weekday（0=月）
+        self.first_day = (today or date.today()) + timedelta(days=min_days)
+
+    def blocked(self, d: datetime | date) -> str | None:
+        d = d.date() if isinstance(d, datetime) else d
+        if d < self.first_day:
+            return "before minDate"
+        if d.weekday() in self.closed_weekdays:
+            return "closed weekday"
+        if d in self.disabled:
+            return "disabledDates"
+        return None
+
+    def __repr__(self):
+        return (f"DayIndex(disabled={len(self.disabled)}, closed={sorted(self.closed_weekdays)}, "
+                f"first_day={self.first_day})")
+
+
+def parse_disabled_dates(text: str) -> set[date]:
+    """"20-9-2025,21-9-2025" → {date(2025, 9, 20), ...}（d-m-yyyy、読めないものは無視）。"""
+    out = set()
+    for part in text.split(","):
+        try:
+            dd, mm, yy = (int(x) for x in part.strip().split("-"))
+            out.add(date(yy, mm, dd))
+        except ValueError:
+            continue
+    return out
+
+
+def parse_day_index(html: str, today: date | None = None) -> DayIndex:
+    m = _RE_DISABLED.search(html)
+    disabled = parse_disabled_dates(m.group(1)) if m else set()
+    closed = set()
+    m = _RE_GETCLOSED.search(html)
+    if m:
+        for js_day, ret in _RE_CASE.findall(m.group(1)):
+            if ret == "true":
+                closed.add((int(js_day) + 6) % 7)  # JS 0=日 → Python 6=日
+    m = _RE_MIN_DATE.search(html)
+    return DayIndex(disabled, closed, int(m.group(1)) if m else 0, today)
+
+
+def fetch_day_index(session, book_url: str) -> DayIndex:
+    """Book ページを 1 回 GET して DayIndex を作る（session は http_engine.HttpSession）。"""
+    status, html = session.request("GET", book_url)
+    if status != 200:
+        raise OSError(f"GET {book_url} -> HTTP {status}")
+    return parse_day_index(html)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+ページの select / datepicker を 1 回の evaluate でまとめて Python の dict/list に取り出す。
+locator.nth(i).inner_text() を option の数だけ呼ぶと、1 回ごとに Chromium との往復が発生する
+（時刻 select だけで 30 個以上）。ここで丸ごと取ってから、照合はすべて手元で行う。
+
+取り出す形:
+  select:   {"index", "id", "name", "label", "visible", "value", "text",
+             "options": [{"text", "value", "selected", "disabled"}, ...]}
+  calendar: {"month", "year", "month_options", "year_options",
+             "cells": [{"day", "selectable", "disabled", "link"}, ...]}
+            （link は .ui-datepicker-calendar 内の a.ui-state-default の何番目か、無ければ -1）
+"""
+
+from datetime import datetime
+
+MONTH_ABBR = ["jan", "feb", "mrt", "apr", "mei", "jun", "jul", "aug", "sep", "okt", "nov", "dec"]
+
+SELECTS_JS = """() => {
+    const labels = Array.from(document.querySelectorAll('label'));
+    const labelFor = (el) => {
+        if (el.id) {
+            const l = document.querySelector(`label[for="${CSS.escape(el.id)}"]`);
+            if (l) return l.innerText.trim();
+        }
+        let prev = null;
+        for (const l of labels) {
+            if (l.compareDocumentPosition(el) & Node.DOCUMENT_POSITION_FOLLOWING) prev = l;
+            else break;
+        }
+        return prev ? prev.innerText.trim() : '';
+    };
+    return Array.from(document.querySelectorAll('select')).map((el, index) => {
+        const style = getComputedStyle(el);
+        const visible = style.visibility !== 'hidden' && style.display !== 'none'
+            && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+        const options = Array.from(el.options).map(o => ({
+            text: o.text.trim(), value: o.value, selected: o.selected, disabled: o.disabled,
+        }));
+        return {
+            index, id: el.id, name: el.name, label: labelFor(el), visible, value: el.value,
+            text: options.map(o => o.text).join('\\n'), options,
+        };
+    });
+}"""
+
+CALENDAR_JS = """() => {
+    const dp = document.querySelector('.ui-datepicker');
+    const cal = dp && dp.querySelector('.ui-datepicker-calendar');
+    if (!cal) return null;
+    const opts = (sel) => sel ? Array.from(sel.options).map(o => ({text: o.text.trim(), value: o.value})) : [];
+    const ms = dp.querySelector('select.ui-datepicker-month');
+    const ys = dp.querySelector('select.ui-datepicker-year');
+    const links = Array.from(cal.querySelectorAll('a.ui-state-default'));
+    const cells = [];
+    cal.querySelectorAll('td').forEach(td => {
+        const t = td.textContent.trim();
+        if (!/^\\d+$/.test(t)) return;
+        const a = td.querySelector('a.ui-state-default');
+        cells.push({
+            day: parseInt(t, 10),
+            selectable: !!a,
+            disabled: td.classList.contains('ui-datepicker-unselectable')
+                || td.classList.contains('ui-state-disabled'),
+            link: a ? links.indexOf(a) : -1,
+        });
+    });
+    return {
+        month: ms ? ms.value : null, year: ys ? ys.value : null,
+        month_options: opts(ms), year_options: opts(ys), cells,
+    };
+}"""
+
+
+# ========= 取得（sync / async） =========
+TARIFF_JS = """() => ({
+    tarief: (document.querySelector('#tarief') || {}).value || '',
+    tariefId: (document.querySelector('#tariefId') || {}).value || '',
+})"""
+
+
+def snapshot_selects(page) -> list[dict]:
+    return page.evaluate(SELECTS_JS)
+
+
+def snapshot_calendar(page) -> dict | None:
+    return page.evaluate(CALENDAR_JS)
+
+
+def snapshot_tariff(page) -> dict:
+    """{"tarief": "25,52", "tariefId": "38"}（無ければ空文字）。"""
+    return page.evaluate(TARIFF_JS)
+
+
+async def async_snapshot_selects(page) -> list[dict]:
+    return await page.evaluate(SELECTS_JS)
+
+
+async def async_snapshot_calendar(page) -> dict | None:
+    return await page.evaluate(CALENDAR_JS)
+
+
+# ========= 手元での照合 =========
+def find_duration_select(selects: list[dict]) -> dict | None:
+    """所要時間の select（"1 uur" / "1,5 uur" と "8 uur" を含む、表示中のもの）。"""
+    for s in selects:
+        txt = s["text"].lower()
+        if s["visible"] and ("1 uur" in txt or "1,5 uur" in txt) and "8 uur" in txt:
+            return s
+    return None
+
+
+def find_time_select(selects: list[dict]) -> dict | None:
+    """時刻の select（option に ':' を含む最初のもの）。"""
+    for s in selects:
+        if ":" in s["text"]:
+            return s
+    return None
+
+
+def option_value(select: dict, text: str) -> str | None:
+    for o in select["options"]:
+        if o["text"] == text:
+            return o["value"] or text
+    return None
+
+
+def select_labels(select: dict | None) -> list[str]:
+    return [o["text"] for o in select["options"]] if select else []
+
+
+def month_option_value(month_options: list[dict], d: datetime) -> str | None:
+    """datepicker の月 select で d の月を表す value（0 始まり → 1 始まり → 略称の順に探す）。"""
+    values = [o["value"] for o in month_options]
+    for val in (str(d.month - 1), str(d.month)):
+        if val in values:
+            return val
+    want = MONTH_ABBR[d.month - 1]
+    for o in month_options:
+        if o["text"].lower() == want or o["value"].lower() == want:
+            return o["value"] or o["text"]
+    return None
+
+
+def month_groups(dates: list[datetime]) -> list[list[int]]:
+    """dates の添字を (年, 月) ごとにまとめる（月順、月の中は日付順）。
+    月をまたいで行き来すると、そのたびにカレンダーが描き直されるため。"""
+    groups: dict[tuple[int, int], list[int]] = {}
+    for i in sorted(range(len(dates)), key=lambda i: dates[i]):
+        groups.setdefault((dates[i].year, dates[i].month), []).append(i)
+    return list(groups.values())
+
+
+def day_link_index(calendar: dict | None, day: int) -> int:
+    """クリックできる日付リンクの番号（無ければ -1）。"""
+    for c in (calendar or {}).get("cells", []):
+        if c["day"] == day and c["selectable"]:
+            return c["link"]
+    return -1
+
+
+def month_availability(calendar: dict | None) -> tuple[list[int], list[int]]:
+    cells = (calendar or {}).get("cells", [])
+    enable = {c["day"] for c in cells if c["selectable"]}
+    disable = {c["day"] for c in cells if c["disabled"]}
+    return sorted(enable), sorted(disable)
+
+
+def select_locator(page, select: dict):
+    """snapshot の select に対応する locator（id があれば id、無ければ順番）。"""
+    if select["id"]:
+        return page.locator(f"select#{select['id']}")
+    return page.locator("select").nth(select["index"])
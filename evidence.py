@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+空きが見つかったときの証跡（screenshots/）の残し方。全画面 PNG は 1 枚 0.5〜1 MB あるので、
+既定では予約フォームの部分だけを JPEG で切り出す。
+
+EVIDENCE=clip（既定）/ full / dom / off
+  clip  EVIDENCE_SELECTOR（既定 #form-Booking、日付・時刻を選ぶ予約フォーム）の要素だけ撮る。見つからなければ表示範囲
+  full  従来どおりページ全体
+  dom   画像は撮らず、select / カレンダーの中身と判定結果を JSON で保存（dom_extract.py の形）
+  off   何も残さない（SCREENSHOTS=false と同じ）
+EVIDENCE_FORMAT=jpeg（既定）/ png / webp、EVIDENCE_QUALITY=70（jpeg / webp）
+  webp は Pillow があるときだけ（無ければ jpeg）
+
+撮影そのものはページの状態が変わる前に済ませる必要があるが、
+エンコード（webp）とファイル書き込みは別スレッドに回して次の対象の判定を待たせない。
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dom_extract import (
+    snapshot_selects,
+    snapshot_calendar,
+    async_snapshot_selects,
+    async_snapshot_calendar,
+)
+
+EVIDENCE_MODE = os.getenv("EVIDENCE", "clip").lower()
+EVIDENCE_FORMAT = os.getenv("EVIDENCE_FORMAT", "jpeg").lower()
+EVIDENCE_QUALITY = int(os.getenv("EVIDENCE_QUALITY", "70"))
+EVIDENCE_SELECTOR = os.getenv("EVIDENCE_SELECTOR", "#form-Booking")  # 上の検索フォームも select を持つ
+MODES = ("clip", "full", "dom", "off")
+EXT = {"jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+
+
+def log(msg): print("[LOG]", msg, file=sys.stderr, flush=True)
+
+
+def _have_pillow() -> bool:
+    try:
+        import PIL.Image  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class EvidenceWriter:
+    def __init__(self, out_dir: Path, mode: str = EVIDENCE_MODE, fmt: str = EVIDENCE_FORMAT,
+                 quality: int = EVIDENCE_QUALITY, selector: str = EVIDENCE_SELECTOR):
+        self.out_dir = Path(out_dir)
+        self.mode = mode if mode in MODES else "clip"
+        self.fmt = fmt if fmt in EXT else "jpeg"
+        if self.fmt == "webp" and self.pixels and not _have_pillow():
+            log("EVIDENCE_FORMAT=webp needs Pillow; using jpeg")
+            self.fmt = "jpeg"
+        self.quality = max(1, min(100, quality))
+        self.selector = selector
+        self._pool = None
+        self._pending = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def pixels(self) -> bool:
+        """画像を撮るか（撮るなら CSS は通す。resource_filter.install の keep_css 用）。"""
+        return self.mode in ("clip", "full")
+
+    # ========= 撮影（sync / async） =========
+    def _shot_options(self) -> dict:
+        if self.fmt == "jpeg":
+            return {"type": "jpeg", "quality": self.quality}
+        return {"type": "png"}  # webp は png から変換
+
+    def capture(self, page, stem: str, row: dict):
+        """page の今の状態を証跡にする。ファイルへの書き込みは別スレッド。"""
+        if self.mode == "off":
+            return
+        if self.mode == "dom":
+            data = {"url": page.url, "row": row,
+                    "selects": snapshot_selects(page), "calendar": snapshot_calendar(page)}
+            self._submit(self._write_json, stem, data)
+            return
+        opts = self._shot_options()
+        if self.mode == "full":
+            shot = page.screenshot(full_page=True, **opts)
+        else:
+            el = page.locator(self.selector).first
+            shot = el.screenshot(**opts) if el.count() else page.screenshot(**opts)
+        self._submit(self._write_image, stem, shot)
+
+    async def async_capture(self, page, stem: str, row: dict):
+        if self.mode == "off":
+            return
+        if self.mode == "dom":
+            data = {"url": page.url, "row": row,
+                    "selects": await async_snapshot_selects(page), "calendar": await async_snapshot_calendar(page)}
+            self._submit(self._write_json, stem, data)
+            return
+        opts = self._shot_options()
+        if self.mode == "full":
+            shot = await page.screenshot(full_page=True, **opts)
+        else:
+            el = page.locator(self.selector).first
+            shot = await el.screenshot(**opts) if await el.count() else await page.screenshot(**opts)
+        self._submit(self._write_image, stem, shot)
+
+    # ========= 書き込み（別スレッド） =========
+    def _submit(self, fn, *args):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="evidence")
+        self._pending = [f for f in self._pending if not f.done()]
+        self._pending.append(self._pool.submit(fn, *args))
+
+    def _write_image(self, stem: str, shot: bytes):
+        try:
+            self.out_dir.mkdir(exist_ok=True)
+            path = self.out_dir / (stem + EXT[self.fmt])
+            if self.fmt == "webp":
+                import io
+                from PIL import Image
+
+                Image.open(io.BytesIO(shot)).save(path, "WEBP", quality=self.quality)
+            else:
+                path.write_bytes(shot)
+        except Exception as e:
+            log(f"evidence {stem} failed: {e}")
+
+    def _write_json(self, stem: str, data: dict):
+        try:
+            self.out_dir.mkdir(exist_ok=True)
+            (self.out_dir / (stem + ".json")).write_text(
+                json.dumps(data, ensure_ascii=False, default=str), encoding="utf-8")
+        except Exception as e:
+            log(f"evidence {stem} failed: {e}")
+
+    def flush(self):
+        """書きかけの証跡をすべて書き終えるまで待つ。"""
+        for f in self._pending:
+            f.result()
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+avo.hta.nl の代わりに記録済みの応答を返すローカルサーバ（オフライン検証・ベンチマーク用）。
+- GET  /uithoorn/Accommodation/Book/<id>          → calendar_dump.html
+- POST /uithoorn/Accommodation/ShowAvailableTimeslots → fixtures/ShowAvailableTimeslots_106.html
+  （所要時間に合わせて終了時刻だけ付け替え、シナリオに応じて枠を間引く）
+- POST /uithoorn/Accommodation/GetFixedHoursDisableDates → 選択不可の日付（JSON 配列）
+- POST /uithoorn/Accommodation/GetActiveTarief    → {}（中身は見ていない）
+- POST /uithoorn/Accommodation/Search             → 時間帯（Daypart）に枠が残っている施設の一覧
+  （施設は SEARCH_HALLS。どの施設も 106 と同じ枠を持つ扱い）
+- GET  /uithoorn/<path>                           → fixtures/static/<path> があれば返す（js/css 等）、無ければ 404
+  js 一式（jquery / jquery-ui / Timeslot.js 等）はリポジトリに含めていない。
+  無いと datepicker が動かないので、ENGINE=http 以外の検証には missing_static() が空である必要がある
+- GET  /__stats                                   → パス別のリクエスト数（JSON）
+
+シナリオ（--scenario）:
+  recorded  記録どおり（disabledDates の日は空、それ以外は全枠）… 既定
+  open      disabledDates も無視して全日全枠
+  full      全日空（どの枠も取れない）
+  sparse    日付と開始時刻から決まる擬似乱数で --density の割合だけ枠を残す（--seed で固定）
+--latency ミリ秒（± --jitter ミリ秒）で全応答を遅らせ、--fail-every N で N 回に 1 回 HTTP 500 を返す。
+
+使い方:
+  python fixture_server.py --port 8765 --latency 150 --scenario sparse
+  BOOK_URL=http://127.0.0.1:8765/uithoorn/Accommodation/Book/106 ENGINE=http \
+      python check_next2weeks_targets.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+ROOT = Path(__file__).resolve().parent
+BOOK_HTML = ROOT / "calendar_dump.html"
+TIMESLOTS_HTML = ROOT / "fixtures" / "ShowAvailableTimeslots_106.html"
+STATIC_DIR = ROOT / "fixtures" / "static"
+
+SCENARIOS = ("recorded", "open", "full", "sparse")
+CONTENT_TYPES = {".js": "application/javascript", ".css": "text/css", ".png": "image/png",
+                 ".gif": "image/gif", ".svg": "image/svg+xml", ".woff2": "font/woff2"}
+
+SEARCH_HALLS = [("106", "Sporthal 106"), ("107", "Sporthal 107"), ("108", "Gymzaal 108")]
+DAYPARTS = {"1": (0, 12), "2": (12, 18), "3": (18, 24)}
+
+_RE_DISABLED = re.compile(r'var disabledDates = "([^"]*)"')
+_RE_SCRIPT = re.compile(r'<script\s+src="/uithoorn/([^"?]+)')
+_RE_SLOT = re.compile(r'<option value="(\d+)">(\d{2}:\d{2}) - (\d{2}:\d{2})</option>')
+
+
+def _hours(value: str) -> float:
+    try:
+        return float(value.replace(",", "."))
+    except ValueError:
+        return 1.0
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive を有効に
+    # 以下は make_server がサーバ毎のサブクラスに設定する
+    book_html = ""
+    slots: list[tuple[str, str]] = []
+    disabled: set[str] = set()
+    scenario = "recorded"
+    density = 0.3
+    seed = 0
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    fail_every = 0
+    stats: dict[str, int] = {}
+    stats_lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status: int, body: str | bytes, ctype: str = "text/html; charset=utf-8"):
+        raw = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(raw)))
+        self.send_header("Set-Cookie", "ASP.NET_SessionId=fixture; path=/; HttpOnly")
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _count(self, path: str) -> int:
+        """パス別の件数を数えて、通算の件数を返す。"""
+        with self.stats_lock:
+            self.stats[path] = self.stats.get(path, 0) + 1
+            self.stats["_total"] = self.stats.get("_total", 0) + 1
+            return self.stats["_total"]
+
+    def _delay_or_fail(self, path: str) -> bool:
+        """遅延を入れ、fail_every に当たったら 500 を返して True。"""
+        n = self._count(path)
+        if self.latency_ms or self.jitter_ms:
+            ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(0.0, ms) / 1000)
+        if self.fail_every and n % self.fail_every == 0:
+            self._send(500, "fixture: injected failure", "text/plain")
+            return True
+        return False
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/__stats":
+            with self.stats_lock:
+                body = json.dumps(self.stats)
+            self._send(200, body, "application/json")
+            return
+        if self._delay_or_fail(path):
+            return
+        if re.match(r"^/uithoorn/Accommodation/Book/\d+$", path):
+            self._send(200, self.book_html)
+            return
+        static = (STATIC_DIR / path.removeprefix("/uithoorn/")).resolve()
+        if path.startswith("/uithoorn/") and static.is_file() and STATIC_DIR.resolve() in static.parents:
+            self._send(200, static.read_bytes(), CONTENT_TYPES.get(static.suffix, "application/octet-stream"))
+        else:
+            self._send(404, "not found", "text/plain")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        path = self.path.split("?")[0]
+        if self._delay_or_fail(path):
+            return
+        if path.endswith("/ShowAvailableTimeslots"):
+            self._send(200, self.render_timeslots(form.get("date", ""), _hours(form.get("hours", "1"))))
+        elif path.endswith("/GetFixedHoursDisableDates"):
+            self._send(200, json.dumps(sorted(self.disabled)), "application/json")
+        elif path.endswith("/GetActiveTarief"):
+            self._send(200, "{}", "application/json")
+        elif path.endswith("/Accommodation/Search"):
+            self._send(200, self.render_search(form))
+        else:
+            self._send(404, "not found", "text/plain")
+
+    def slot_open(self, d: datetime, start: str) -> bool:
+        if self.scenario == "full":
+            return False
+        if self.scenario == "open":
+            return True
+        if f"{d.day}-{d.month}-{d.year}" in self.disabled:
+            return False
+        if self.scenario == "sparse":
+            h = zlib.crc32(f"{self.seed}:{d:%Y-%m-%d}:{start}".encode())
+            return (h % 10000) / 10000 < self.density
+        return True
+
+    def render_search(self, form: dict) -> str:
+        try:
+            d = datetime.strptime(form.get("Date", ""), "%Y-%m-%d")
+        except ValueError:
+            return "<html><body><p>Geen resultaten</p></body></html>"
+        lo, hi = DAYPARTS.get(form.get("Daypart", "0"), (0, 24))
+        hours = _hours(form.get("Duration", "1"))
+        found = any(self.slot_open(d, start) and lo <= int(start[:2]) < hi
+                    and int(start[:2]) + hours <= 24 for _, start in self.slots)
+        items = "".join(f'<li class="result"><a href="/uithoorn/Accommodation/Book/{i}"><h3>{name}</h3></a></li>'
+                        for i, name in SEARCH_HALLS) if found else ""
+        return f'<html><body><a href="/uithoorn/Home">Home</a><ul class="results">{items}</ul></body></html>'
+
+    def render_timeslots(self, date_iso: str, hours: float) -> str:
+        try:
+            d = datetime.strptime(date_iso, "%Y-%m-%d")
+        except ValueError:
+            return ""
+        out = []
+        for value, start in self.slots:
+            if not self.slot_open(d, start):
+                continue
+            s = datetime.strptime(start, "%H:%M")
+            e = s + timedelta(hours=hours)
+            if e.day != s.day:
+                continue
+            out.append(f'<option value="{value}">{start} - {e.strftime("%H:%M")}</option>')
+        # 空きが無い日もセレクトの中身（プレースホルダ）は返す。空の応答は http_engine がエラー扱いにする
+        return "".join(out) or '<option value="">Geen tijden beschikbaar</option>'
+
+
+def missing_static() -> list[str]:
+    """Book ページが読み込む /uithoorn/ 配下の script のうち fixtures/static/ に無いもの。
+    1 つでも欠けていればブラウザ（Playwright）ではページが動かない。"""
+    return [p for p in _RE_SCRIPT.findall(BOOK_HTML.read_text(encoding="utf-8"))
+            if not (STATIC_DIR / p).is_file()]
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, scenario: str = "recorded",
+                latency_ms: float = 0.0, jitter_ms: float = 0.0, fail_every: int = 0,
+                density: float = 0.3, seed: int = 0) -> ThreadingHTTPServer:
+    """設定ごとに FixtureHandler のサブクラスを作るので、同じプロセスで複数立てても混ざらない。
+    サーバの .stats でパス別のリクエスト数が読める。"""
+    if scenario not in SCENARIOS:
+        raise ValueError(f"unknown scenario: {scenario} (choose from {', '.join(SCENARIOS)})")
+    html = BOOK_HTML.read_text(encoding="utf-8")
+    m = _RE_DISABLED.search(html)
+    disabled = set(filter(None, (m.group(1) if m else "").split(",")))
+    if scenario == "open":
+        html = _RE_DISABLED.sub('var disabledDates = ""', html)
+        disabled = set()
+    stats: dict[str, int] = {}
+    handler = type("Handler", (FixtureHandler,), {
+        "book_html": html,
+        "disabled": disabled,
+        "slots": [(v, s) for v, s, _ in _RE_SLOT.findall(TIMESLOTS_HTML.read_text(encoding="utf-8"))],
+        "scenario": scenario,
+        "density": density,
+        "seed": seed,
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "fail_every": fail_every,
+        "stats": stats,
+        "stats_lock": threading.Lock(),
+    })
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    srv.stats = stats
+    return srv
+
+
+def serve_in_thread(host: str = "127.0.0.1", port: int = 0, **options) -> tuple[ThreadingHTTPServer, str]:
+    """バックグラウンドで起動し (server, BOOK_URL) を返す。止めるときは server.shutdown()。
+    options は make_server にそのまま渡す（scenario / latency_ms など）。"""
+    srv = make_server(host, port, **options)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    h, p = srv.server_address[:2]
+    return srv, f"http://{h}:{p}/uithoorn/Accommodation/Book/106"
+
+
+def add_server_args(ap: argparse.ArgumentParser):
+    """fixture_server と bench.py で共通の引数。"""
+    ap.add_argument("--scenario", choices=SCENARIOS, default="recorded")
+    ap.add_argument("--latency", type=float, default=0.0, help="応答の遅延（ミリ秒）")
+    ap.add_argument("--jitter", type=float, default=0.0, help="遅延のばらつき（± ミリ秒）")
+    ap.add_argument("--fail-every", type=int, default=0, help="N 回に 1 回 HTTP 500 を返す（0 で無効）")
+    ap.add_argument("--density", type=float, default=0.3, help="sparse で残す枠の割合")
+    ap.add_argument("--seed", type=int, default=0)
+
+
+def server_options(args) -> dict:
+    return {"scenario": args.scenario, "latency_ms": args.latency, "jitter_ms": args.jitter,
+            "fail_every": args.fail_every, "density": args.density, "seed": args.seed}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="court-checker fixture server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    add_server_args(ap)
+    args = ap.parse_args()
+    srv = make_server(args.host, args.port, **server_options(args))
+    print(f"[+] fixture ({args.scenario}, latency {args.latency}ms): "
+          f"http://{args.host}:{args.port}/uithoorn/Accommodation/Book/106", flush=True)
+    missing = missing_static()
+    if missing:
+        print(f"[!] fixtures/static/ lacks {', '.join(missing)}: only ENGINE=http works offline", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
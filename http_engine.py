@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+ブラウザを起動せずに Book ページの AJAX エンドポイントを直接叩くエンジン。
+- Book ページを 1 回だけ GET して __RequestVerificationToken と hidden input の URL を取得
+  (ShowAvailableTimeSlotURL / GetFixedHoursDisableDatesURL / ActiveTarieftURL)
+- 同じ HTML から休館曜日・disabledDates・minDate を読み（day_index.py）、その日は POST しない
+- 以降は同じ keep-alive 接続で ShowAvailableTimeslots に日付・所要時間を POST
+- 応答（<option> の HTML でも JSON でも）から枠（timeslots.Timeslot、"20:00 - 21:30" と枠 id）を取り出す
+
+Chromium を立ち上げないので 1 回数百 ms / 数 MB で済む。
+応答が想定外の形なら HttpEngineError を投げるので、呼び出し側で Playwright にフォールバックする。
+"""
+
+import json
+import re
+from datetime import datetime
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from day_index import DayIndex, parse_day_index
+from timeslots import Timeslot, parse_label, parse_options, parse_tariff, with_tariff
+from timing import phase
+
+# ShowAvailableTimeslots へ送るフォーム項目名。Timeslot.js（HelloTimeSlot）は手元に無く、実サイトとは未照合。
+# 名前が違うとサイトは枠の無い応答を返しうるので、その形の応答は HttpEngineError にして Playwright に回す
+TIMESLOT_PARAMS = {
+    "hours": "hours",
+    "accommodation": "accommodationId",
+    "date": "date",
+    "fixed": "fixedHoursType",
+}
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) court-checker"
+CHUNK_SIZE = 16 * 1024
+
+_RE_TOKEN = re.compile(r'name="__RequestVerificationToken"\s+type="hidden"\s+value="([^"]+)"')
+_RE_HIDDEN = re.compile(r'<input\s+type="hidden"\s+id="(\w+URL)"\s+value="([^"]*)"')
+_RE_SELECT = re.compile(r'<select\b[^>]*\bid="(\w+)"[^>]*>(.*?)</select>', re.S | re.I)
+_RE_OPTION = re.compile(r'<option\b[^>]*?value="([^"]*)"[^>]*>([^<]*)</option>', re.I)
+_RE_ACCOM_ID = re.compile(r"/Book/(\d+)")
+
+
+class HttpEngineError(RuntimeError):
+    """サイトの応答が想定と違う（トークン無し・ステータス異常など）。"""
+
+
+# ========= HTTP セッション =========
+class HttpSession:
+    """ホスト毎に http.client の接続を保持して使い回す最小限のセッション（Cookie 付き）。
+    rate_limiter（scheduler.HostRateLimiter）を渡すとリクエスト前にホスト別の間隔を守る。"""
+
+    def __init__(self, timeout: float = 15.0, rate_limiter=None):
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cookies: dict[str, str] = {}
+        self.requests_issued = 0
+        self._conns: dict[tuple[str, str], "http.client.HTTPConnection"] = {}
+
+    def _conn(self, scheme: str, netloc: str, fresh: bool = False) -> "http.client.HTTPConnection":
+        # http.client（ssl/email を引き込む）は実際に通信するときだけ読み込む
+        import http.client
+
+        key = (scheme, netloc)
+        if fresh and key in self._conns:
+            self._conns.pop(key).close()
+        if key not in self._conns:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            self._conns[key] = cls(netloc, timeout=self.timeout)
+        return self._conns[key]
+
+    def request(self, method: str, url: str, data: dict | None = None,
+                headers: dict | None = None, redirects: int = 3, on_chunk=None) -> tuple[int, str]:
+        """on_chunk を渡すと本文を CHUNK_SIZE ごとに文字列で渡し、溜めずに "" を返す（長い一覧ページ用）。"""
+        import codecs
+        import http.client
+
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        body = urlencode(data) if data is not None else None
+        hdrs = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity", "Connection": "keep-alive"}
+        if body is not None:
+            hdrs["Content-Type"] = "application/x-www-form-urlencoded; charset=UTF-8"
+        if self.cookies:
+            hdrs["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        hdrs.update(headers or {})
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait(url)
+
+        # keep-alive 切れに備えて 1 回だけ張り直す
+        for attempt in range(2):
+            conn = self._conn(parts.scheme, parts.netloc, fresh=attempt > 0)
+            try:
+                conn.request(method, path, body=body, headers=hdrs)
+                resp = conn.getresponse()
+                if on_chunk is None or resp.status in (301, 302, 303, 307, 308):
+                    text = resp.read().decode("utf-8", errors="replace")
+                else:
+                    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                    while chunk := resp.read(CHUNK_SIZE):
+                        on_chunk(decoder.decode(chunk))
+                    on_chunk(decoder.decode(b"", final=True))
+                    text = ""
+                break
+            except (http.client.HTTPException, OSError):
+                if attempt:
+                    raise
+        self.requests_issued += 1
+
+        for raw in resp.headers.get_all("Set-Cookie") or []:
+            name, _, rest = raw.partition("=")
+            self.cookies[name.strip()] = rest.split(";", 1)[0]
+
+        if resp.status in (301, 302, 303, 307, 308) and redirects > 0:
+            loc = urljoin(url, resp.headers.get("Location", ""))
+            return self.request("GET", loc, headers=headers, redirects=redirects - 1, on_chunk=on_chunk)
+        return resp.status, text
+
+    def close(self):
+        for c in self._conns.values():
+            c.close()
+        self._conns.clear()
+
+
+# ========= 解析 =========
+def parse_select_options(html: str) -> dict[str, list[tuple[str, str]]]:
+    """ページ内の全 <select id=...> について [(value, text), ...] を返す。"""
+    out = {}
+    for sel_id, inner in _RE_SELECT.findall(html):
+        out[sel_id] = [(v, t.strip()) for v, t in _RE_OPTION.findall(inner)]
+    return out
+
+
+def parse_timeslot_labels(body: str) -> list[str]:
+    """ShowAvailableTimeslots の応答から "HH:MM - HH:MM" のラベル一覧を取り出す。"""
+    text = body.strip()
+    if text[:1] in "[{":
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise HttpEngineError(f"timeslot JSON broken: {e}") from e
+        if isinstance(data, dict):
+            data = data.get("TimeSlots") or data.get("timeSlots") or data.get("data") or []
+        labels = []
+        for item in data:
+            if isinstance(item, str):
+                labels.append(item.strip())
+            elif isinstance(item, dict):
+                if item.get("Text") or item.get("text"):
+                    labels.append(str(item.get("Text") or item.get("text")).strip())
+                elif item.get("StartTime") and item.get("EndTime"):
+                    labels.append(f"{item['StartTime'][:5]} - {item['EndTime'][:5]}")
+        return [t for t in labels if ":" in t]
+    return [t.strip() for _, t in _RE_OPTION.findall(text) if ":" in t]
+
+
+# ========= エンジン本体 =========
+class HttpEngine:
+    """Book ページ 1 回 + 日付毎に POST 1 回で空き状況を調べる。"""
+
+    def __init__(self, book_url: str, session: HttpSession | None = None):
+        self.book_url = book_url
+        self.session = session or HttpSession()
+        m = _RE_ACCOM_ID.search(book_url)
+        self.accommodation_id = m.group(1) if m else ""
+        self.token = ""
+        self.urls: dict[str, str] = {}
+        self.durations: list[tuple[str, str]] = []
+        self.day_index = DayIndex()
+        self.tariff: tuple[float | None, str] = (None, "")
+
+    def bootstrap(self):
+        """Book ページを GET してトークン・エンドポイント・所要時間の選択肢を読む。"""
+        with phase("http_bootstrap", accom=self.accommodation_id):
+            status, html = self.session.request("GET", self.book_url)
+        if status != 200:
+            raise HttpEngineError(f"GET {self.book_url} -> HTTP {status}")
+        tokens = _RE_TOKEN.findall(html)
+        if not tokens:
+            raise HttpEngineError("__RequestVerificationToken not found")
+        # 予約フォーム（form-Booking）側のトークンが最後に出てくる
+        self.token = tokens[-1]
+        self.urls = {k: urljoin(self.book_url, v) for k, v in _RE_HIDDEN.findall(html)}
+        if "ShowAvailableTimeSlotURL" not in self.urls:
+            raise HttpEngineError("ShowAvailableTimeSlotURL not found")
+        self.durations = parse_select_options(html).get("selectedTimeLength", [])
+        self.day_index = parse_day_index(html)
+        self.tariff = parse_tariff(html)
+        return html
+
+    def fork(self) -> "HttpEngine":
+        """bootstrap 済みの状態（トークン・Cookie・選択肢）を引き継ぎ、接続だけ別にしたエンジン。
+        HttpSession はスレッド間で共有できないので、並列に POST するときはワーカーごとに fork する。"""
+        session = HttpSession(self.session.timeout, self.session.rate_limiter)
+        session.cookies = dict(self.session.cookies)
+        other = HttpEngine(self.book_url, session=session)
+        other.token, other.urls = self.token, dict(self.urls)
+        other.durations, other.day_index = list(self.durations), self.day_index
+        other.tariff = self.tariff
+        return other
+
+    def duration_value(self, preferred_label: str) -> str:
+        """set_duration と同じく preferred が無ければ '1 uur' を選ぶ。"""
+        labels = {t: v for v, t in self.durations}
+        want = preferred_label if preferred_label in labels else "1 uur"
+        return labels.get(want, want.split()[0])
+
+    def fetch_timeslots(self, d: datetime, duration_value: str) -> list[str]:
+        """ラベルだけ欲しいとき（キャッシュ・matrix の表）。判定には fetch_slots の Timeslot を使う。"""
+        return [s.label for s in self.fetch_slots(d, duration_value)]
+
+    def fetch_slots(self, d: datetime, duration_value: str) -> list[Timeslot]:
+        """その日の枠（option の value = 枠 id、Book ページの時間単価付き）。"""
+        if not self.token:
+            self.bootstrap()
+        p = TIMESLOT_PARAMS
+        data = {
+            p["hours"]: duration_value,
+            p["accommodation"]: self.accommodation_id,
+            p["date"]: d.strftime("%Y-%m-%d"),
+            p["fixed"]: "false",
+            "__RequestVerificationToken": self.token,
+        }
+        headers = {"X-Requested-With": "XMLHttpRequest", "RequestVerificationToken": self.token,
+                   "Referer": self.book_url}
+        with phase("http_timeslots", accom=self.accommodation_id, date=d):
+            status, body = self.session.request("POST", self.urls["ShowAvailableTimeSlotURL"], data, headers)
+        if status != 200:
+            raise HttpEngineError(f"ShowAvailableTimeslots -> HTTP {status}")
+        text = body.strip()
+        if text[:1] in ("[", "{"):
+            slots = [s for s in (parse_label(t) for t in parse_timeslot_labels(text)) if s]
+        elif _RE_OPTION.search(text):
+            slots = parse_options(text)
+        else:
+            # 空き無しの日も <option> は返る前提。何も無いのは送った項目名が通じていない可能性が高い
+            raise HttpEngineError(f"ShowAvailableTimeslots returned no <option>/JSON for {d:%Y-%m-%d} "
+                                  f"(check TIMESLOT_PARAMS)")
+        return with_tariff(slots, *self.tariff)
+
+    def close(self):
+        self.session.close()
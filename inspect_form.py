@@ -1,6 +1,8 @@
 from playwright.sync_api import sync_playwright
 from pathlib import Path
 
+from dom_extract import snapshot_selects
+
 URL = "https://avo.hta.nl/uithoorn/Accommodation/Detail/106"
 OUT_IMG = Path("snap_form.png")
 
@@ -20,48 +22,19 @@ def main():
         except Exception as e:
             print("[-] Screenshot failed:", e)
 
-        # 全selectのラベル名・選択肢を列挙
-        selects = page.locator("select")
-        count = selects.count()
-        print(f"[+] Found {count} <select> elements")
-        for i in range(count):
-            sel = selects.nth(i)
-            # labelを推定（for属性 or 近傍テキスト）
-            label_text = None
-            try:
-                sel_id = sel.get_attribute("id")
-                if sel_id:
-                    label = page.locator(f"label[for='{sel_id}']")
-                    if label.count() > 0:
-                        label_text = label.nth(0).inner_text().strip()
-            except:
-                pass
-            if not label_text:
-                # 近傍テキストで代替
-                try:
-                    label_text = sel.locator("xpath=preceding::label[1]").inner_text().strip()
-                except:
-                    label_text = "(label not found)"
-
-            # option列挙
-            options = sel.locator("option")
-            opts = []
-            for j in range(options.count()):
-                txt = options.nth(j).inner_text().strip()
-                val = options.nth(j).get_attribute("value")
-                opts.append((txt, val))
-
-            print(f"\n== SELECT #{i+1} | Label: {label_text} ==")
-            for (txt, val) in opts:
-                print(f" - option: '{txt}' (value='{val}')")
+        # 全selectのラベル名・選択肢を列挙（labelは for属性 or 直前のlabel、1 回の evaluate で取得）
+        selects = snapshot_selects(page)
+        print(f"[+] Found {len(selects)} <select> elements")
+        for i, sel in enumerate(selects):
+            print(f"\n== SELECT #{i+1} | Label: {sel['label'] or '(label not found)'} ==")
+            for o in sel["options"]:
+                print(f" - option: '{o['text']}' (value='{o['value']}')")
 
         # ボタン類（検索・予約へ）
-        buttons = page.locator("button, input[type=submit], a[role=button]")
-        btn_texts = []
-        for i in range(buttons.count()):
-            t = buttons.nth(i).inner_text().strip()
-            if t:
-                btn_texts.append(t)
+        btn_texts = page.eval_on_selector_all(
+            "button, input[type=submit], a[role=button]",
+            "els => els.map(e => (e.innerText || e.value || '').trim()).filter(t => t)",
+        )
         print("\n[+] Buttons found:", btn_texts)
 
         browser.close()
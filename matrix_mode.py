@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+期間全体（horizon）の空き状況を「日付 × 開始時刻」の表にまとめるモード。
+- 月ごとに datepicker を 1 回だけ切り替え、選択可の日を一括で読む（read_month_availability）
+- 対象曜日かつ選択可の日だけクリックして時刻 select を読む
+- カレンダーで選択不可の日は時刻を取りに行かない（混んでいる週はほとんどがこれ）
+- 出力は matrix.csv / matrix.json
+
+1 日ずつ聞くやり方に比べて、6〜8 週間の horizon でも現実的な時間で終わる。
+"""
+
+import csv
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from book_page import (
+    open_datepicker,
+    set_month_year_in_datepicker,
+    click_day_in_calendar,
+    read_time_labels,
+    read_month_availability,
+)
+from timeslots import match_start
+from readiness import wait_datepicker_visible, wait_month_shown, click_and_wait_timeslots
+from timing import phase
+
+MATRIX_CSV = Path("matrix.csv")
+MATRIX_JSON = Path("matrix.json")
+WD_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+# ========= 計画 =========
+def horizon_dates(today: datetime, weeks: int, weekdays: set[str]) -> list[datetime]:
+    """明日から weeks 週間後までの、対象曜日の日付一覧。"""
+    base = datetime(today.year, today.month, today.day)
+    out = []
+    for i in range(1, weeks * 7 + 1):
+        d = base + timedelta(days=i)
+        if WD_LABELS[d.weekday()] in weekdays:
+            out.append(d)
+    return out
+
+
+def group_by_month(dates: list[datetime]) -> dict[tuple[int, int], list[datetime]]:
+    months: dict[tuple[int, int], list[datetime]] = {}
+    for d in dates:
+        months.setdefault((d.year, d.month), []).append(d)
+    return months
+
+
+def starts_by_weekday(base_targets: list[tuple]) -> dict[str, list[str]]:
+    out: dict[str, list[str]] = {}
+    for wd, hhmm in base_targets:
+        if hhmm not in out.setdefault(wd, []):
+            out[wd].append(hhmm)
+    return out
+
+
+# ========= 取得 =========
+def read_labels_playwright(page, dates: list[datetime]) -> dict[str, list[str] | None]:
+    """日付ごとの時刻ラベル一覧。カレンダーで選択不可の日は None。
+    読めなかった日（月）はキーを入れない（build_grid / series_mode.build_series で ERROR）。"""
+    labels: dict[str, list[str] | None] = {}
+    for (_, _), days in group_by_month(dates).items():
+        try:
+            with phase("month_switch", date=days[0]):
+                open_datepicker(page)
+                wait_datepicker_visible(page)
+                set_month_year_in_datepicker(page, days[0])
+                wait_month_shown(page, days[0])
+                enabled, _ = read_month_availability(page)
+        except Exception as e:
+            # その月は諦めて次の月へ
+            print(f"[LOG] matrix: {days[0]:%Y-%m} failed: {str(e)[:120]}", file=sys.stderr, flush=True)
+            continue
+        enabled = set(enabled)
+        for i, d in enumerate(days):
+            key = d.strftime("%Y-%m-%d")
+            if d.day not in enabled:
+                labels[key] = None
+                continue
+            try:
+                if i:
+                    # 日付クリックでピッカーが閉じるので開き直す（月は前回の表示のまま）
+                    with phase("open_datepicker", date=d):
+                        open_datepicker(page)
+                        wait_datepicker_visible(page)
+                        set_month_year_in_datepicker(page, d)
+                        wait_month_shown(page, d)
+                with phase("day_click", date=d):
+                    clicked = click_and_wait_timeslots(page, lambda: click_day_in_calendar(page, d.day))
+                with phase("read_times", date=d):
+                    labels[key] = read_time_labels(page) if clicked else None
+            except Exception as e:
+                # 1 日失敗しても続行（check_on_page と同じ）
+                print(f"[LOG] matrix: {key} failed: {str(e)[:120]}", file=sys.stderr, flush=True)
+    return labels
+
+
+def read_labels_http(engine, dates: list[datetime], duration_value: str) -> dict[str, list[str] | None]:
+    """HTTP エンジン版。HTML で選べない日（engine.day_index）は None、それ以外は全部問い合わせる。"""
+    return {d.strftime("%Y-%m-%d"): None if engine.day_index.blocked(d) else engine.fetch_timeslots(d, duration_value)
+            for d in dates}
+
+
+# ========= 出力 =========
+def build_grid(dates: list[datetime], starts: dict[str, list[str]],
+               labels: dict[str, list[str] | None], min_minutes: int = 0) -> tuple[list[str], list[dict]]:
+    """(列にする開始時刻, 行) を返す。セルは YES/NO、その曜日の対象外は空欄。
+    min_minutes より短い枠しか無ければ NO（timeslots.match_start）。labels に無い日は ERROR。"""
+    columns = sorted({h for hs in starts.values() for h in hs})
+    rows = []
+    for d in dates:
+        key = d.strftime("%Y-%m-%d")
+        wd = WD_LABELS[d.weekday()]
+        day_labels = labels.get(key)
+        row = {"date": key, "weekday": wd, "enabled": day_labels is not None, "slots": {}}
+        if key not in labels:
+            row["error"] = True
+        for hhmm in columns:
+            if hhmm not in starts.get(wd, []):
+                row["slots"][hhmm] = ""
+                continue
+            if key not in labels:
+                row["slots"][hhmm] = "ERROR"
+                continue
+            ok, label = match_start(day_labels or [], hhmm, min_minutes)
+            row["slots"][hhmm] = "YES" if ok else "NO"
+            if ok:
+                row.setdefault("labels", {})[hhmm] = label
+        rows.append(row)
+    return columns, rows
+
+
+def write_matrix(columns: list[str], rows: list[dict],
+                 csv_path: Path = MATRIX_CSV, json_path: Path = MATRIX_JSON):
+    with csv_path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["date", "weekday", "enabled"] + columns)
+        for r in rows:
+            w.writerow([r["date"], r["weekday"], "1" if r["enabled"] else "0"]
+                       + [r["slots"][h] for h in columns])
+    payload = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "columns": columns,
+        "rows": rows,
+    }
+    json_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def print_matrix(columns: list[str], rows: list[dict]):
+    print("date       wd  " + " ".join(f"{h:>5}" for h in columns))
+    for r in rows:
+        cells = " ".join(f"{(r['slots'][h] or '-'):>5}" for h in columns)
+        note = "  ERROR ⚠️" if r.get("error") else "" if r["enabled"] else "  (closed)"
+        print(f"{r['date']} {r['weekday']} {cells}{note}")
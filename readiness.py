@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+固定 sleep / networkidle の代わりに「ページが実際に出す合図」を待つためのヘルパー。
+- ページ準備完了: jQuery UI の datepicker が初期化された（#datepicker.hasDatepicker）
+- AJAX 完了:     jQuery.active が 0 に戻った
+- ピッカー表示:   .ui-datepicker が visible
+- 月の切替:       ピッカーの月/年 select が目的の値になった
+- 時刻一覧の更新: 日付クリックで飛んだ ShowAvailableTimeslots の応答が届き、AJAX が落ち着いた
+
+networkidle は leaflet のタイル等も待ってしまうので使わない。
+同じ名前で async 版（async_ で始まる関数）も用意（concurrent_check.py 用）。
+"""
+
+from datetime import datetime
+
+TIMESLOT_URL_PART = "ShowAvailableTimeslots"
+
+READY_JS = """() => !!(window.jQuery && jQuery.datepicker
+    && document.querySelector('#datepicker.hasDatepicker, input.hasDatepicker'))"""
+AJAX_IDLE_JS = "() => !window.jQuery || jQuery.active === 0"
+MONTH_SHOWN_JS = """([m, y]) => {
+    const ms = document.querySelector('.ui-datepicker select.ui-datepicker-month');
+    const ys = document.querySelector('.ui-datepicker select.ui-datepicker-year');
+    if (ms && ys) return ms.value == m && ys.value == y;
+    const td = document.querySelector('.ui-datepicker td[data-month]');
+    return !!td && td.dataset.month == m && td.dataset.year == y;
+}"""
+
+
+# ========= sync =========
+def wait_ajax_idle(page, timeout: float = 15000):
+    page.wait_for_function(AJAX_IDLE_JS, timeout=timeout)
+
+
+def wait_book_ready(page, timeout: float = 20000):
+    """datepicker の初期化と初回の時刻一覧（HelloTimeSlot）の取得が終わるまで待つ。"""
+    page.wait_for_function(READY_JS, timeout=timeout)
+    wait_ajax_idle(page, timeout)
+
+
+def goto_ready(page, url: str, timeout: float = 45000):
+    page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+    wait_book_ready(page, timeout)
+
+
+def reload_ready(page, timeout: float = 45000):
+    page.reload(wait_until="domcontentloaded", timeout=timeout)
+    wait_book_ready(page, timeout)
+
+
+def wait_datepicker_visible(page, timeout: float = 5000) -> bool:
+    try:
+        page.wait_for_selector(".ui-datepicker", state="visible", timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+def wait_month_shown(page, d: datetime, timeout: float = 5000) -> bool:
+    try:
+        page.wait_for_function(MONTH_SHOWN_JS, arg=[str(d.month - 1), str(d.year)], timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+def click_and_wait_timeslots(page, click, timeout: float = 15000) -> bool:
+    """click() を実行し、それで飛んだ時刻一覧の XHR の応答と AJAX 完了を待つ。
+    click() が False を返した（押せる日が無かった）ら何も待たずに False。"""
+    pending = []
+
+    def on_request(req):
+        if TIMESLOT_URL_PART in req.url:
+            pending.append(req)
+
+    page.on("request", on_request)
+    try:
+        if not click():
+            return False
+    finally:
+        page.remove_listener("request", on_request)
+    for req in pending:
+        req.response()  # 応答が届くまで待つ（失敗なら None）
+    wait_ajax_idle(page, timeout)
+    return True
+
+
+# ========= async =========
+async def async_wait_ajax_idle(page, timeout: float = 15000):
+    await page.wait_for_function(AJAX_IDLE_JS, timeout=timeout)
+
+
+async def async_wait_book_ready(page, timeout: float = 20000):
+    await page.wait_for_function(READY_JS, timeout=timeout)
+    await async_wait_ajax_idle(page, timeout)
+
+
+async def async_goto_ready(page, url: str, timeout: float = 45000):
+    await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+    await async_wait_book_ready(page, timeout)
+
+
+async def async_wait_datepicker_visible(page, timeout: float = 5000) -> bool:
+    try:
+        await page.wait_for_selector(".ui-datepicker", state="visible", timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+async def async_wait_month_shown(page, d: datetime, timeout: float = 5000) -> bool:
+    try:
+        await page.wait_for_function(MONTH_SHOWN_JS, arg=[str(d.month - 1), str(d.year)], timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+async def async_click_and_wait_timeslots(page, click, timeout: float = 15000) -> bool:
+    pending = []
+
+    def on_request(req):
+        if TIMESLOT_URL_PART in req.url:
+            pending.append(req)
+
+    page.on("request", on_request)
+    try:
+        if not await click():
+            return False
+    finally:
+        page.remove_listener("request", on_request)
+    for req in pending:
+        await req.response()
+    await async_wait_ajax_idle(page, timeout)
+    return True
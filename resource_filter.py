@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+チェック中に不要なリソースを読み込まないようにするリクエストの振り分け（Playwright の route）。
+通すのは次だけ:
+- ページ本体の HTML
+- datepicker に必要な jQuery 系スクリプトと Timeslot.js
+- /Accommodation/ 以下への XHR（ShowAvailableTimeslots など）
+画像・フォント・メディア・地図タイル・CSS・leaflet.js 等はすべて abort する。
+（leaflet.js が無いと地図の初期化でエラーになるが、別の ready ハンドラなので datepicker には影響しない）
+スクリーンショットを撮る回（keep_css=True）は Book ページと同じホストの CSS だけ通す
+（CSS が無いと画面が崩れるため。画像・フォント・メディア・解析スクリプト・地図タイルは撮る回でも止める）。
+
+BLOCK_RESOURCES=auto（既定）/ true / false
+  auto と true は同じ（常に振り分ける）。false で何も止めない。
+"""
+
+import os
+import re
+from urllib.parse import urlsplit
+
+BLOCK_MODE = os.getenv("BLOCK_RESOURCES", "auto").lower()
+
+ALLOWED_SCRIPT = re.compile(r"/js/(jquery[^/]*|Timeslot)\.js$", re.I)
+XHR_TYPES = {"xhr", "fetch"}
+
+
+def blocking_enabled(screenshots: bool) -> bool:
+    """振り分けを掛けるか。screenshots の回も掛ける（CSS を通すかは install の keep_css で決める）。"""
+    return BLOCK_MODE not in ("false", "0", "off")
+
+
+def is_allowed(resource_type: str, url: str, book_hosts: set[str], keep_css: bool = False) -> bool:
+    parts = urlsplit(url)
+    if parts.scheme in ("data", "blob"):
+        return True
+    if parts.hostname not in book_hosts:
+        return False  # 地図タイル・CDN など
+    if resource_type == "document":
+        return True
+    if resource_type == "script":
+        return bool(ALLOWED_SCRIPT.search(parts.path))
+    if resource_type in XHR_TYPES:
+        return "/Accommodation/" in parts.path
+    if resource_type == "stylesheet":
+        return keep_css
+    return False
+
+
+def _handler(book_urls: list[str], counter: dict | None, keep_css: bool):
+    hosts = {urlsplit(u).hostname for u in book_urls}
+
+    def decide(route):
+        req = route.request
+        ok = is_allowed(req.resource_type, req.url, hosts, keep_css)
+        if counter is not None:
+            key = "allowed" if ok else "blocked"
+            counter[key] = counter.get(key, 0) + 1
+        return ok
+
+    return decide
+
+
+def install(context, book_urls: list[str], counter: dict | None = None, keep_css: bool = False):
+    """context の全リクエストに振り分けを掛ける（sync API 用）。book_urls のホスト以外は全部止める。
+    keep_css=True（スクリーンショットを撮る回）なら Book ページのホストの CSS は通す。"""
+    decide = _handler(book_urls, counter, keep_css)
+    context.route("**/*", lambda route: route.continue_() if decide(route) else route.abort())
+
+
+async def async_install(context, book_urls: list[str], counter: dict | None = None, keep_css: bool = False):
+    decide = _handler(book_urls, counter, keep_css)
+
+    async def on_route(route):
+        if decide(route):
+            await route.continue_()
+        else:
+            await route.abort()
+
+    await context.route("**/*", on_route)
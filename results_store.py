@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+判定結果の保存先（SQLite）。results.csv に毎回追記する代わりに、
+同じ枠（施設・日付・開始時刻）の状態が変わらない間は 1 行の「区間」にまとめる。
+
+  intervals: accommodation, date, weekday, start, available, slot_label,
+             since（その状態を最初に見た run_ts）, until（最後に見た run_ts）, polls（見た回数）,
+             is_current（その枠の最新の区間なら 1）
+  runs:      run_ts, accommodation（いつどの施設をチェックしたか）
+
+- 状態（YES/NO/ERROR と枠ラベル）が前回と同じなら until と polls を更新するだけ
+- date / weekday+start / since / until / is_current に索引があるので
+  「今後 14 日の YES」「Mon 20:00 の履歴」が全件走査なしで引ける
+- CSV への書き出しは従来の results.csv と同じ列（run_ts,date,weekday,start,available,slot_label,accommodation）。
+  区間を runs の run_ts で展開して 1 run 1 行に戻す
+  （同じ施設の run では毎回同じ枠を見ている前提。途中で targets を変えた場合は近似になる）
+
+  python results_store.py import results.csv          # 既存の CSV を取り込む
+  python results_store.py export results.csv          # 従来形式で書き出す
+  python results_store.py yes --days 14               # 今後 14 日の空き（最新の状態）
+  python results_store.py history Mon 20:00 [--accommodation 106]
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(os.getenv("RESULTS_DB", ".cache/results.sqlite3"))
+CSV_HEADER = ["run_ts", "date", "weekday", "start", "available", "slot_label", "accommodation"]
+
+
+class ResultsStore:
+    def __init__(self, path: Path = DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS intervals (
+                id            INTEGER PRIMARY KEY,
+                accommodation TEXT NOT NULL,
+                date          TEXT NOT NULL,
+                weekday       TEXT NOT NULL,
+                start         TEXT NOT NULL,
+                available     TEXT NOT NULL,
+                slot_label    TEXT NOT NULL DEFAULT '',
+                since         TEXT NOT NULL,
+                until         TEXT NOT NULL,
+                polls         INTEGER NOT NULL DEFAULT 1,
+                is_current    INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS intervals_key ON intervals(accommodation, date, start, is_current);
+            CREATE INDEX IF NOT EXISTS intervals_date ON intervals(date);
+            CREATE INDEX IF NOT EXISTS intervals_wd_start ON intervals(weekday, start);
+            CREATE INDEX IF NOT EXISTS intervals_since ON intervals(since);
+            CREATE INDEX IF NOT EXISTS intervals_until ON intervals(until);
+            CREATE INDEX IF NOT EXISTS intervals_current ON intervals(is_current, available, date);
+            CREATE TABLE IF NOT EXISTS runs (
+                run_ts        TEXT NOT NULL,
+                accommodation TEXT NOT NULL,
+                PRIMARY KEY (run_ts, accommodation)
+            );
+        """)
+        self.db.commit()
+
+    # ========= 書き込み =========
+    def record(self, rows: list[dict], run_ts: str | None = None, default_accommodation: str = ""):
+        """1 回分の判定結果（make_row の dict）を取り込む。"""
+        run_ts = run_ts or datetime.now().isoformat(timespec="seconds")
+        with self.db:
+            for r in rows:
+                self._observe(run_ts, r, r.get("accommodation") or default_accommodation)
+
+    def _observe(self, run_ts: str, r: dict, accom: str):
+        self.db.execute("INSERT OR IGNORE INTO runs VALUES (?, ?)", (run_ts, accom))
+        label = r.get("slot_label") or ""
+        cur = self.db.execute(
+            "SELECT id, available, slot_label, until FROM intervals "
+            "WHERE accommodation=? AND date=? AND start=? AND is_current=1",
+            (accom, r["date"], r["start"]),
+        ).fetchone()
+        if cur and run_ts < cur["until"]:
+            return  # 古い run の取り込み（import の順序違い）は無視
+        if cur and cur["available"] == r["available"] and cur["slot_label"] == label:
+            if run_ts != cur["until"]:
+                self.db.execute("UPDATE intervals SET until=?, polls=polls+1 WHERE id=?", (run_ts, cur["id"]))
+            return
+        if cur:
+            self.db.execute("UPDATE intervals SET is_current=0 WHERE id=?", (cur["id"],))
+        self.db.execute(
+            "INSERT INTO intervals (accommodation, date, weekday, start, available, slot_label, since, until) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (accom, r["date"], r["weekday"], r["start"], r["available"], label, run_ts, run_ts),
+        )
+
+    def import_csv(self, path: Path, default_accommodation: str = "") -> int:
+        """results.csv（accommodation 列が無い古い形式も可）を run_ts 順に取り込む。"""
+        with Path(path).open(newline="", encoding="utf-8") as f:
+            rows = sorted(csv.DictReader(f), key=lambda r: r["run_ts"])
+        with self.db:
+            for r in rows:
+                self._observe(r["run_ts"], r, r.get("accommodation") or default_accommodation)
+        return len(rows)
+
+    # ========= 問い合わせ =========
+    def current_yes(self, days: int = 14, today: datetime | None = None,
+                    accommodation: str | None = None) -> list[dict]:
+        """今日から days 日以内で、最新の状態が YES の枠。"""
+        today = today or datetime.now()
+        lo = today.strftime("%Y-%m-%d")
+        hi = (today + timedelta(days=days)).strftime("%Y-%m-%d")
+        sql = ("SELECT * FROM intervals WHERE is_current=1 AND available='YES' AND date BETWEEN ? AND ?")
+        args: list = [lo, hi]
+        if accommodation:
+            sql += " AND accommodation=?"
+            args.append(accommodation)
+        return [dict(r) for r in self.db.execute(sql + " ORDER BY date, start, accommodation", args)]
+
+    def history(self, weekday: str, start: str, accommodation: str | None = None) -> list[dict]:
+        """曜日 + 開始時刻の全区間（日付・時刻順）。"""
+        sql = "SELECT * FROM intervals WHERE weekday=? AND start=?"
+        args: list = [weekday, start]
+        if accommodation:
+            sql += " AND accommodation=?"
+            args.append(accommodation)
+        return [dict(r) for r in self.db.execute(sql + " ORDER BY date, since", args)]
+
+    def export_csv(self, path: Path) -> int:
+        """従来の results.csv 形式で書き出す（区間を run ごとの行に展開）。"""
+        cur = self.db.execute("""
+            SELECT r.run_ts, i.date, i.weekday, i.start, i.available, i.slot_label, i.accommodation
+            FROM intervals i
+            JOIN runs r ON r.accommodation = i.accommodation AND r.run_ts BETWEEN i.since AND i.until
+            ORDER BY r.run_ts, i.accommodation, i.date, i.start
+        """)
+        n = 0
+        with Path(path).open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(CSV_HEADER)
+            for row in cur:
+                w.writerow(list(row))
+                n += 1
+        return n
+
+    def close(self):
+        self.db.close()
+
+
+# ========= CLI =========
+def _print_intervals(rows: list[dict]):
+    for r in rows:
+        span = r["since"] if r["since"] == r["until"] else f"{r['since']} .. {r['until']}"
+        label = f" [{r['slot_label']}]" if r["slot_label"] else ""
+        print(f"#{r['accommodation']} {r['date']} ({r['weekday']}) {r['start']} {r['available']}{label}"
+              f"  {span} ({r['polls']} polls)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="court-checker results store")
+    ap.add_argument("--db", default=str(DEFAULT_DB_PATH))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("import", help="results.csv を取り込む")
+    p.add_argument("csv")
+    p.add_argument("--accommodation", default="106", help="accommodation 列が無い行に使う id")
+    p = sub.add_parser("export", help="従来の results.csv 形式で書き出す")
+    p.add_argument("csv")
+    p = sub.add_parser("yes", help="今後 N 日の空き（最新の状態）")
+    p.add_argument("--days", type=int, default=14)
+    p.add_argument("--accommodation")
+    p = sub.add_parser("history", help="曜日 + 開始時刻の履歴")
+    p.add_argument("weekday")
+    p.add_argument("start")
+    p.add_argument("--accommodation")
+    args = ap.parse_args(argv)
+
+    store = ResultsStore(Path(args.db))
+    try:
+        if args.cmd == "import":
+            print(f"imported {store.import_csv(Path(args.csv), args.accommodation)} rows")
+        elif args.cmd == "export":
+            print(f"exported {store.export_csv(Path(args.csv))} rows")
+        elif args.cmd == "yes":
+            _print_intervals(store.current_yes(args.days, accommodation=args.accommodation))
+        elif args.cmd == "history":
+            _print_intervals(store.history(args.weekday, args.start, args.accommodation))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
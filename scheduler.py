@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+複数の施設（Book/<id>）をまとめてチェックするための設定読み込みとレート制限。
+
+slots.json の例:
+{
+  "weeks_ahead": 2,
+  "rate_limit": {"avo.hta.nl": 0.5},
+  "accommodations": [
+    {"id": 106, "name": "Gymzaal A", "duration": "1,5 uur",
+     "targets": [{"weekday": "Mon", "start": "20:00"}]},
+    {"url": "https://avo.hta.nl/uithoorn/Accommodation/Book/107",
+     "targets": [{"weekday": "Thu", "start": "20:00"}]}
+  ]
+}
+"accommodations" が無ければ従来どおり BOOK_URL + トップレベルの targets を 1 施設として扱う。
+実際の振り分け（ブラウザ/HTTP セッション共有）は check_next2weeks_targets.py の check_all。
+
+AdaptivePoller は watch.py 用の「枠ごとの適応ポーリング間隔 + 1 時間あたりの予算」。
+"""
+
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+DEFAULT_RATE_LIMIT = float(os.getenv("RATE_LIMIT", "0.5"))  # 同一ホストへの最小間隔（秒）
+
+
+class HostRateLimiter:
+    """ホストごとにリクエスト間隔の下限を守る（スレッド/async どちらからでも使える）。"""
+
+    def __init__(self, default_interval: float = DEFAULT_RATE_LIMIT, per_host: dict | None = None):
+        self.default_interval = default_interval
+        self.per_host = dict(per_host or {})
+        self._next: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, per_host: dict):
+        self.per_host.update({h: float(v) for h, v in per_host.items()})
+
+    def reserve(self, url_or_host: str) -> float:
+        """次の枠を予約し、それまで待つべき秒数を返す。"""
+        host = urlsplit(url_or_host).hostname or url_or_host
+        interval = self.per_host.get(host, self.default_interval)
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next.get(host, 0.0))
+            self._next[host] = at + interval
+        return at - now
+
+    def wait(self, url_or_host: str):
+        delay = self.reserve(url_or_host)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def book_url_for(accom_id: str, template_url: str) -> str:
+    """BOOK_URL の末尾の id を差し替えた URL。"""
+    return re.sub(r"/Book/\d+", f"/Book/{accom_id}", template_url)
+
+
+def load_accommodations(cfg: dict, default_url: str, default_duration: str,
+                        default_weeks: int, default_targets: list[tuple]) -> list[dict]:
+    """[{"id", "url", "name", "duration", "weeks_ahead", "targets": [(weekday, start), ...]}, ...]"""
+    items = cfg.get("accommodations")
+    if not items:
+        m = re.search(r"/Book/(\d+)", default_url)
+        return [{
+            "id": m.group(1) if m else default_url,
+            "url": default_url,
+            "name": "",
+            "duration": default_duration,
+            "weeks_ahead": default_weeks,
+            "targets": default_targets,
+        }]
+
+    out = []
+    for a in items:
+        url = a.get("url") or book_url_for(str(a["id"]), default_url)
+        m = re.search(r"/Book/(\d+)", url)
+        targets = [(t["weekday"], t["start"]) for t in a.get("targets", [])] or default_targets
+        out.append({
+            "id": str(a.get("id") or (m.group(1) if m else url)),
+            "url": url,
+            "name": a.get("name", ""),
+            "duration": a.get("duration", default_duration),
+            "weeks_ahead": int(a.get("weeks_ahead", default_weeks)),
+            "targets": targets,
+        })
+    return out
+
+
+# ========= 適応ポーリング =========
+class AdaptivePoller:
+    """枠（施設・日付・開始時刻）ごとに次にチェックする時刻を持ち、期限が来たものだけ返す。
+
+    - 状態が変わった / ERROR → 間隔を min_interval に戻す
+    - NO が続く → 毎回 2 倍（カレンダーで日ごと選べない日は 4 倍）、上限 max_interval
+    - 日付が近いほど上限を下げる（当日 min_interval、1 日前 2 倍、2 日前 4 倍 …）
+    - 1 時間あたりのリクエスト数（施設・日付の数で数える）を budget_per_hour に抑える。
+      足りないときは期限の古いもの → 日付の近いものを優先
+    """
+
+    def __init__(self, min_interval: float = 120, max_interval: float = 3600,
+                 budget_per_hour: int = 120, clock=time.time):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.budget_per_hour = budget_per_hour
+        self.clock = clock
+        self.slots: dict[tuple, dict] = {}  # key -> {"next", "interval", "last"}
+        self._spent: list[float] = []       # 直近 1 時間に使ったリクエストの時刻
+
+    @staticmethod
+    def key(accom_id: str, date_iso: str, start: str) -> tuple:
+        return (accom_id, date_iso, start)
+
+    def _cap(self, date_iso: str, now: float) -> float:
+        days = (datetime.strptime(date_iso, "%Y-%m-%d").date() - datetime.fromtimestamp(now).date()).days
+        return min(self.max_interval, self.min_interval * 2 ** max(0, days))
+
+    def remaining_budget(self, now: float | None = None) -> int:
+        now = self.clock() if now is None else now
+        self._spent = [t for t in self._spent if now - t < 3600]
+        return max(0, self.budget_per_hour - len(self._spent))
+
+    def due(self, plan: list[tuple], now: float | None = None) -> list[tuple]:
+        """plan [(accom, [(date, weekday, start), ...]), ...] のうち今チェックすべきものだけ同じ形で返す。"""
+        now = self.clock() if now is None else now
+        budget = self.remaining_budget(now)
+        cands = []
+        for gi, (accom, targets) in enumerate(plan):
+            for d, wd, hhmm in targets:
+                st = self.slots.get(self.key(accom["id"], d.strftime("%Y-%m-%d"), hhmm))
+                nxt = st["next"] if st else 0.0
+                if nxt <= now:
+                    cands.append((nxt, d, gi, (d, wd, hhmm)))
+        cands.sort(key=lambda c: (c[0], c[1]))
+
+        picked: dict[int, list] = {}
+        dates: set[tuple] = set()
+        for _, d, gi, target in cands:
+            dk = (gi, d.strftime("%Y-%m-%d"))
+            if dk not in dates:
+                if len(dates) >= budget:
+                    continue  # 同じ日付の別の開始時刻なら追加の費用なし
+                dates.add(dk)
+            picked.setdefault(gi, []).append(target)
+        self._spent += [now] * len(dates)
+        return [(plan[gi][0], picked[gi]) for gi in sorted(picked)]
+
+    def update(self, rows: list[dict], now: float | None = None):
+        """チェック結果（make_row の dict）で各枠の次回時刻を決める。"""
+        now = self.clock() if now is None else now
+        for r in rows:
+            k = self.key(r.get("accommodation", ""), r["date"], r["start"])
+            st = self.slots.get(k)
+            avail = r["available"]
+            if st is None or avail == "ERROR" or st["last"] != avail:
+                interval = self.min_interval
+            elif avail == "NO":
+                interval = st["interval"] * (4 if r.get("day_closed") else 2)
+            else:
+                interval = st["interval"]
+            interval = min(interval, self._cap(r["date"], now))
+            self.slots[k] = {"next": now + interval, "interval": interval, "last": avail}
+
+    def next_wakeup(self, plan: list[tuple], now: float | None = None) -> float:
+        """次に何かの期限が来るまでの秒数（予算切れなら枠が空くまで）。"""
+        now = self.clock() if now is None else now
+        nexts = [self.slots.get(self.key(a["id"], d.strftime("%Y-%m-%d"), h), {"next": now})["next"]
+                 for a, targets in plan for d, _, h in targets]
+        wait = max(0.0, min(nexts, default=now + self.max_interval) - now)
+        if self.remaining_budget(now) == 0 and self._spent:
+            wait = max(wait, 3600 - (now - min(self._spent)))
+        return wait
+
+    def prune(self, today_iso: str):
+        self.slots = {k: v for k, v in self.slots.items() if k[1] >= today_iso}
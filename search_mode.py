@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+施設をまたいだ検索モード（MODE=search）。Book ページ上部の検索フォーム
+（POST /uithoorn/Accommodation/Search: Date / DayOfTheWeek / Daypart / Duration / Activity）に
+対象 1 件につき 1 回問い合わせ、「その日その時間帯に空いている施設」の一覧を得る。
+- 一覧は受信しながら少しずつ読み、Book/<id>（Detail/<id>）へのリンクだけ拾う（SearchResultParser）
+- 一覧に出た施設だけ Book ページに入って開始時刻まで確かめる（http_engine.HttpEngine）
+- 施設 N × 対象 M 回の巡回が、検索 M 回 + 当たりの分だけになる
+- 出力は標準出力と search.json
+
+検索フォームは開始時刻ではなく時間帯（Ochtend / Middag / Avond）で絞るので、
+時間帯は開始時刻から決める（12 時前 = 1、18 時前 = 2、それ以降 = 3）。
+slots.json の "search": {"activity": 6} で種目（Activity の value、既定 0 = 指定なし）を絞れる。
+"""
+
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urljoin
+
+from http_engine import HttpEngine, HttpEngineError, HttpSession
+from timeslots import duration_minutes, match_slots
+from timing import phase
+
+SEARCH_JSON = Path("search.json")
+DEFAULT_ACTIVITY = "0"
+
+_RE_SEARCH_FORM = re.compile(r'<form\b[^>]*action="([^"]*/Accommodation/Search)"[^>]*>(.*?)</form>', re.S | re.I)
+_RE_FORM_TOKEN = re.compile(r'name="__RequestVerificationToken"\s+type="hidden"\s+value="([^"]+)"')
+_RE_RESULT_LINK = re.compile(
+    r'<a\b[^>]*href="([^"]*/Accommodation/(?:Book|Detail)/(\d+))"[^>]*>(.*?)</a>', re.S | re.I)
+_RE_OPEN_ANCHOR = re.compile(r"<a\b", re.I)
+_RE_TAGS = re.compile(r"<[^>]+>")
+
+
+# ========= 一覧の読み取り =========
+class SearchResultParser:
+    """検索結果の HTML を少しずつ feed して、施設へのリンクを出てきた順に集める。
+    チャンクの境目で切れたリンクは次の feed まで持ち越す。"""
+
+    MAX_CARRY = 8192
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.hits: list[dict] = []
+        self._seen: set[str] = set()
+        self._buf = ""
+
+    def feed(self, text: str):
+        self._buf += text
+        end = 0
+        for m in _RE_RESULT_LINK.finditer(self._buf):
+            end = m.end()
+            href, accom_id, inner = m.groups()
+            if accom_id in self._seen:
+                continue
+            self._seen.add(accom_id)
+            name = " ".join(_RE_TAGS.sub(" ", inner).split())
+            book_url = urljoin(self.base_url, href.replace("/Detail/", "/Book/"))
+            self.hits.append({"id": accom_id, "name": name, "url": book_url})
+        rest = self._buf[end:]
+        # 閉じていない <a ...> があればそこから先だけ持ち越す
+        opens = [m.start() for m in _RE_OPEN_ANCHOR.finditer(rest)]
+        rest = rest[opens[-1]:] if opens else rest[-16:]
+        self._buf = rest[-self.MAX_CARRY:]
+
+
+# ========= 問い合わせ =========
+def daypart(hhmm: str) -> str:
+    hour = int(hhmm.split(":")[0])
+    return "1" if hour < 12 else "2" if hour < 18 else "3"
+
+
+def js_weekday(d: datetime) -> str:
+    """DayOfTheWeek の value（JS の getDay: 0=日）。"""
+    return str((d.weekday() + 1) % 7)
+
+
+class SearchClient:
+    def __init__(self, book_url: str, session: HttpSession, activity: str = DEFAULT_ACTIVITY):
+        self.book_url = book_url
+        self.session = session
+        self.activity = activity
+        self.action = ""
+        self.token = ""
+
+    def bootstrap(self):
+        """Book ページから検索フォームの送信先とトークンを読む。"""
+        with phase("search_bootstrap"):
+            status, html = self.session.request("GET", self.book_url)
+        if status != 200:
+            raise HttpEngineError(f"GET {self.book_url} -> HTTP {status}")
+        m = _RE_SEARCH_FORM.search(html)
+        if not m:
+            raise HttpEngineError("Accommodation/Search form not found")
+        token = _RE_FORM_TOKEN.search(m.group(2))
+        if not token:
+            raise HttpEngineError("search form token not found")
+        self.action = urljoin(self.book_url, m.group(1))
+        self.token = token.group(1)
+
+    def search(self, d: datetime, hhmm: str, duration: str) -> list[dict]:
+        """その日・その時間帯に空きのある施設 [{"id", "name", "url"}, ...]。"""
+        if not self.token:
+            self.bootstrap()
+        data = {
+            "__RequestVerificationToken": self.token,
+            "Date": d.strftime("%Y-%m-%d"),
+            "SearchDayOfTheWeek": js_weekday(d),
+            "DayOfTheWeek": js_weekday(d),
+            "Daypart": daypart(hhmm),
+            "Duration": duration,
+            "Activity": self.activity,
+        }
+        parser = SearchResultParser(self.action)
+        with phase("search", date=d, start=hhmm):
+            status, _ = self.session.request("POST", self.action, data, {"Referer": self.book_url},
+                                             on_chunk=parser.feed)
+        if status != 200:
+            raise HttpEngineError(f"Accommodation/Search -> HTTP {status}")
+        return parser.hits
+
+
+def duration_value(label: str) -> str:
+    """"1,5 uur" → "1,5"（検索フォームの Duration の value）。"""
+    return label.split()[0]
+
+
+def run_search(book_url: str, targets: list[tuple], duration_label: str, activity: str = DEFAULT_ACTIVITY,
+               rate_limiter=None) -> list[dict]:
+    """targets [(date, weekday, start), ...] ごとに検索し、一覧に出た施設だけ開始時刻を確かめる。"""
+    session = HttpSession(rate_limiter=rate_limiter)
+    client = SearchClient(book_url, session, activity)
+    engines: dict[str, HttpEngine] = {}
+    out = []
+    try:
+        for d, wd, hhmm in targets:
+            row = {"date": d.strftime("%Y-%m-%d"), "weekday": wd, "start": hhmm, "candidates": 0, "matches": []}
+            try:
+                hits = client.search(d, hhmm, duration_value(duration_label))
+            except (HttpEngineError, OSError) as e:
+                row["error"] = str(e)[:120]
+                out.append(row)
+                continue
+            row["candidates"] = len(hits)
+            for hit in hits:
+                try:
+                    engine = engines.get(hit["id"])
+                    if engine is None:
+                        engine = engines[hit["id"]] = HttpEngine(hit["url"], session=session)
+                        engine.bootstrap()
+                    if engine.day_index.blocked(d):
+                        continue
+                    slots = engine.fetch_slots(d, engine.duration_value(duration_label))
+                except (HttpEngineError, OSError) as e:
+                    row.setdefault("errors", {})[hit["id"]] = str(e)[:120]
+                    continue
+                ok, label = match_slots(slots, hhmm, duration_minutes(duration_label))
+                if ok:
+                    row["matches"].append(dict(hit, slot_label=label))
+            out.append(row)
+    finally:
+        session.close()
+    return out
+
+
+# ========= 出力 =========
+def print_search(rows: list[dict]):
+    for r in rows:
+        head = f"{r['date']} ({r['weekday']}) {r['start']}{' ' + r['duration'] if 'duration' in r else ''} →"
+        if "error" in r:
+            print(f"{head} ERROR ⚠️ [{r['error']}]")
+        elif not r["matches"]:
+            print(f"{head} none ({r['candidates']} candidate(s))")
+        else:
+            halls = ", ".join(f"#{m['id']}{' ' + m['name'] if m['name'] else ''} [{m['slot_label']}]"
+                              for m in r["matches"])
+            print(f"{head} {halls}")
+
+
+def write_search(rows: list[dict], path: Path = SEARCH_JSON):
+    payload = {"generated": datetime.now().isoformat(timespec="seconds"), "rows": rows}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+シーズン通しの定期枠（「月曜 20:00 を毎週 6 月まで」）を一括で調べるモード（MODE=series）。
+予約フォームの定期予約（IsRecurring + enddatepicker）で押さえたい枠が、終了日までの各週で空いているか。
+- targets の曜日 × 開始時刻を、明日から終了日までの毎週の日付に展開する
+- 日付の集合は全対象でまとめ、取得は matrix と同じ
+  （HTTP なら HTML で選べない日を除いて日付ごとに POST 1 回、ブラウザなら月ごとにカレンダーを 1 回読む）
+- 対象ごとに日付ごとの YES/NO と、YES が続く最長の区間（何週連続で取れるか）を出す
+- 出力は標準出力と series.json
+
+終了日は SERIES_UNTIL（YYYY-MM-DD）> slots.json "series_until" > 次の 6/30。
+"""
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from timeslots import match_start
+
+SERIES_JSON = Path("series.json")
+WD_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+# ========= 計画 =========
+def default_until(today: datetime) -> datetime:
+    """シーズン終わり（次の 6 月 30 日）。"""
+    year = today.year + 1 if today.month > 6 else today.year
+    return datetime(year, 6, 30)
+
+
+def series_dates(today: datetime, weekday: str, until: datetime) -> list[datetime]:
+    """明日から until（含む）までの weekday の日付。"""
+    d = datetime(today.year, today.month, today.day) + timedelta(days=1)
+    d += timedelta(days=(WD_LABELS.index(weekday) - d.weekday()) % 7)
+    out = []
+    while d <= until:
+        out.append(d)
+        d += timedelta(days=7)
+    return out
+
+
+# ========= 集計 =========
+def longest_run(flags: list[bool]) -> tuple[int, int]:
+    """True が続く最長の区間の (開始位置, 長さ)。無ければ (-1, 0)。"""
+    best, start, cur = (-1, 0), 0, 0
+    for i, ok in enumerate(flags):
+        if ok:
+            if cur == 0:
+                start = i
+            cur += 1
+            if cur > best[1]:
+                best = (start, cur)
+        else:
+            cur = 0
+    return best
+
+
+def build_series(base_targets: list[tuple], dates_by_target: dict[tuple, list[datetime]],
+                 labels: dict[str, list[str] | None], min_minutes: int = 0) -> list[dict]:
+    """対象ごとに日付ごとの可否と最長連続区間をまとめる。labels が None の日は選べない日（NO）。"""
+    out = []
+    for wd, hhmm in base_targets:
+        dates = dates_by_target[(wd, hhmm)]
+        days = []
+        for d in dates:
+            key = d.strftime("%Y-%m-%d")
+            if key not in labels:
+                days.append({"date": key, "available": "ERROR", "slot_label": ""})
+                continue
+            ok, label = match_start(labels[key] or [], hhmm, min_minutes)
+            day = {"date": key, "available": "YES" if ok else "NO", "slot_label": label}
+            if labels[key] is None:
+                day["day_closed"] = True
+            days.append(day)
+        start, length = longest_run([x["available"] == "YES" for x in days])
+        out.append({
+            "weekday": wd,
+            "start": hhmm,
+            "weeks": len(days),
+            "bookable": sum(x["available"] == "YES" for x in days),
+            "longest_run": {"from": days[start]["date"], "to": days[start + length - 1]["date"],
+                            "weeks": length} if length else None,
+            "dates": days,
+        })
+    return out
+
+
+# ========= 出力 =========
+def print_series(series: list[dict], until: datetime):
+    for s in series:
+        run = s["longest_run"]
+        best = f"longest {run['weeks']} week(s) {run['from']} .. {run['to']}" if run else "no bookable week"
+        print(f"{s['weekday']} {s['start']} until {until:%Y-%m-%d}: {s['bookable']}/{s['weeks']} bookable, {best}")
+        print("  " + " ".join("✅" if x["available"] == "YES" else "⚠️" if x["available"] == "ERROR" else "·"
+                              for x in s["dates"]))
+
+
+def write_series(series: list[dict], until: datetime, path: Path = SERIES_JSON):
+    payload = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "until": until.strftime("%Y-%m-%d"),
+        "series": series,
+    }
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+所要時間の選択肢（selectedTimeLength: 1 uur / 1,5 uur / 2 uur ...）をまとめて調べるモード（MODE=sweep）。
+set_duration は 1 つしか選ばないので、「1 / 1,5 / 2 uur ならそれぞれどこが取れるか」を知るには
+これまで全体を所要時間の数だけ回す必要があった。
+- Book ページの GET は 1 回（トークン・選択肢・選べない日はそこから読む。http_engine.HttpEngine）
+- 日付はワーカー（SWEEP_CONCURRENCY、既定 4）に分けて並列に ShowAvailableTimeslots を POST する
+  ワーカーは HttpEngine.fork() で接続だけ別にし、ホストごとの間隔（RATE_LIMITER）は共有する
+- 1 日の中では長い所要時間から聞き、長い枠が S に始まるなら短い所要時間でも S は空いているとみなす
+  対象の開始時刻がすべて埋まった所要時間は POST しない（SWEEP_DERIVE=false で全部聞く）
+- 出力は日付ごとの「所要時間 × 開始時刻」表。標準出力と sweep.csv / sweep.json
+
+ブラウザ版は無い（時刻一覧を所要時間ごとに取り直すには select の切り替えが要るため）。
+所要時間は SWEEP_DURATIONS（"1 uur,1,5 uur" のように ' uur' 区切り）> slots.json "sweep_durations" > 全部。
+"""
+
+import csv
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from http_engine import HttpEngine, HttpEngineError
+from timeslots import duration_minutes, match_slots
+
+SWEEP_CSV = Path("sweep.csv")
+SWEEP_JSON = Path("sweep.json")
+SWEEP_CONCURRENCY = int(os.getenv("SWEEP_CONCURRENCY", "4"))
+SWEEP_DERIVE = os.getenv("SWEEP_DERIVE", "true").lower() == "true"
+WD_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+_RE_DURATION_LABEL = re.compile(r"\d+(?:,\d+)?\s*uur")
+
+
+# ========= 計画 =========
+def parse_duration_list(text: str) -> list[str]:
+    """"1 uur,1,5 uur, 2 uur" → ["1 uur", "1,5 uur", "2 uur"]（小数のカンマと区切りのカンマを区別する）。"""
+    return [" ".join(m.split()) for m in _RE_DURATION_LABEL.findall(text or "")]
+
+
+def pick_durations(options: list[tuple[str, str]], wanted: list[str] | None = None) -> list[tuple[str, str]]:
+    """select の選択肢 [(value, label), ...] から調べるものを長い順に。wanted が無ければ全部。"""
+    picked = [(v, t) for v, t in options if not wanted or t in wanted]
+    return sorted(picked, key=lambda vt: duration_minutes(vt[1]), reverse=True)
+
+
+# ========= 取得 =========
+def sweep_day(engine: HttpEngine, d: datetime, durations: list[tuple[str, str]], starts: list[str],
+              derive: bool = SWEEP_DERIVE) -> dict[str, dict]:
+    """1 日分。{所要時間ラベル: {"fetched": bool, "slots": {hhmm: "YES"/"NO"}, "labels": {...}}}
+    durations は長い順。derive なら長い所要時間で空いていた開始時刻は短い方でも YES。"""
+    out: dict[str, dict] = {}
+    known: set[str] = set()
+    for value, label in durations:
+        cell: dict = {"fetched": False, "slots": {}}
+        if derive and starts and known.issuperset(starts):
+            cell["slots"] = {h: "YES" for h in starts}
+            out[label] = cell
+            continue
+        slots = engine.fetch_slots(d, value)
+        cell["fetched"] = True
+        for hhmm in starts:
+            ok, slot_label = match_slots(slots, hhmm, duration_minutes(label))
+            ok = ok or (derive and hhmm in known)
+            cell["slots"][hhmm] = "YES" if ok else "NO"
+            if ok:
+                known.add(hhmm)
+                if slot_label:
+                    cell.setdefault("labels", {})[hhmm] = slot_label
+        out[label] = cell
+    return out
+
+
+def run_sweep(engine: HttpEngine, dates: list[datetime], starts: dict[str, list[str]],
+              wanted: list[str] | None = None, concurrency: int = SWEEP_CONCURRENCY,
+              derive: bool = SWEEP_DERIVE) -> tuple[list[str], list[dict]]:
+    """engine は bootstrap 済み。(所要時間ラベル（長い順）, 日付ごとの行) を返す。"""
+    durations = pick_durations(engine.durations, wanted)
+    if not durations:
+        raise HttpEngineError("selectedTimeLength options not found")
+    open_dates = [d for d in dates if not engine.day_index.blocked(d)]
+    n = max(1, min(concurrency, len(open_dates)))
+    forks = [engine] + [engine.fork() for _ in range(n - 1)]
+    by_date: dict[str, dict] = {}
+
+    def work(i: int):
+        # 日付を i, i+n, i+2n ... と受け持つ（ワーカーごとに接続 1 本）
+        for d in open_dates[i::n]:
+            key = d.strftime("%Y-%m-%d")
+            try:
+                by_date[key] = sweep_day(forks[i], d, durations,
+                                         starts.get(WD_LABELS[d.weekday()], []), derive)
+            except (HttpEngineError, OSError) as e:
+                by_date[key] = {"error": str(e)[:120]}
+
+    try:
+        with ThreadPoolExecutor(max_workers=n, thread_name_prefix="sweep") as pool:
+            list(pool.map(work, range(n)))
+    finally:
+        for f in forks[1:]:
+            f.close()
+
+    rows = []
+    for d in dates:
+        key = d.strftime("%Y-%m-%d")
+        row = {"date": key, "weekday": WD_LABELS[d.weekday()], "enabled": key in by_date}
+        day = by_date.get(key, {})
+        if "error" in day:
+            row["error"] = day["error"]
+        else:
+            row["durations"] = day
+        rows.append(row)
+    return [t for _, t in durations], rows
+
+
+# ========= 出力 =========
+def _cell(row: dict, label: str, hhmm: str) -> str:
+    if "error" in row:
+        return "ERROR"
+    if not row["enabled"]:
+        return "NO"
+    return row["durations"][label]["slots"].get(hhmm, "")
+
+
+def print_sweep(durations: list[str], starts: dict[str, list[str]], rows: list[dict]):
+    width = max(len(t) for t in durations)
+    for r in rows:
+        hours = sorted(starts.get(r["weekday"], []))
+        note = f"  ERROR ⚠️ [{r['error']}]" if "error" in r else "" if r["enabled"] else "  (closed)"
+        print(f"{r['date']} ({r['weekday']}){note}")
+        if "error" in r or not r["enabled"]:
+            continue
+        print("  " + " " * width + " " + " ".join(f"{h:>5}" for h in hours))
+        for t in durations:
+            marks = " ".join(f"{'✅' if _cell(r, t, h) == 'YES' else '·':>5}" for h in hours)
+            print(f"  {t:>{width}} {marks}")
+
+
+def write_sweep(durations: list[str], starts: dict[str, list[str]], rows: list[dict],
+                csv_path: Path = SWEEP_CSV, json_path: Path = SWEEP_JSON):
+    with csv_path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["date", "weekday", "start"] + durations)
+        for r in rows:
+            for hhmm in sorted(starts.get(r["weekday"], [])):
+                w.writerow([r["date"], r["weekday"], hhmm] + [_cell(r, t, hhmm) for t in durations])
+    payload = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "durations": durations,
+        "rows": rows,
+    }
+    json_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
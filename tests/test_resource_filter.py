@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""resource_filter の振り分け（スクリーンショットを撮る回は CSS だけ通す）。"""
+
+import resource_filter
+from resource_filter import blocking_enabled, is_allowed
+
+HOSTS = {"avo.hta.nl"}
+BOOK = "https://avo.hta.nl/uithoorn"
+
+
+def test_auto_blocks_in_screenshot_runs(monkeypatch):
+    monkeypatch.setattr(resource_filter, "BLOCK_MODE", "auto")
+    assert blocking_enabled(True)
+    assert blocking_enabled(False)
+    monkeypatch.setattr(resource_filter, "BLOCK_MODE", "false")
+    assert not blocking_enabled(True)
+
+
+def test_screenshot_run_keeps_only_css():
+    keep = dict(book_hosts=HOSTS, keep_css=True)
+    assert is_allowed("stylesheet", f"{BOOK}/css/bootstrap.min.css", **keep)
+    assert is_allowed("document", f"{BOOK}/Accommodation/Book/106", **keep)
+    assert is_allowed("script", f"{BOOK}/js/Timeslot.js", **keep)
+    assert is_allowed("xhr", f"{BOOK}/Accommodation/ShowAvailableTimeslots", **keep)
+    # 撮る回でも画像・フォント・メディア・解析・地図タイルは止める
+    assert not is_allowed("image", f"{BOOK}/img/hall.jpg", **keep)
+    assert not is_allowed("font", f"{BOOK}/webfonts/fa-solid-900.woff2", **keep)
+    assert not is_allowed("media", f"{BOOK}/video/intro.mp4", **keep)
+    assert not is_allowed("script", "https://www.googletagmanager.com/gtag/js?id=G-1", **keep)
+    assert not is_allowed("image", "https://tile.openstreetmap.org/13/4207/2692.png", **keep)
+    assert not is_allowed("stylesheet", "https://fonts.googleapis.com/css?family=Roboto", **keep)
+
+
+def test_plain_run_blocks_css():
+    assert not is_allowed("stylesheet", f"{BOOK}/css/app.css", HOSTS)
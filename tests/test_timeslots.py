@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""Book ページの時間単価（#tarief / #tariefId）を Timeslot に載せる。"""
+
+from pathlib import Path
+
+from timeslots import parse_options, parse_tariff, with_tariff
+
+DUMP = Path(__file__).resolve().parent.parent / "calendar_dump.html"
+
+
+def test_parse_tariff_from_book_page():
+    assert parse_tariff(DUMP.read_text(encoding="utf-8")) == (25.52, "38")
+
+
+def test_parse_tariff_missing():
+    assert parse_tariff("<form></form>") == (None, "")
+
+
+def test_slot_price_from_tariff():
+    slots = with_tariff(parse_options('<option value="33">15:00 - 16:30</option>'), 25.52, "38")
+    assert slots[0].tariff_id == "38"
+    assert slots[0].price == 38.28
+    assert parse_options('<option value="33">15:00 - 16:30</option>')[0].price is None
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+時刻一覧（ShowAvailableTimeslots の応答 / 時刻 select のラベル）を型付きの枠にして引けるようにする。
+Timeslot.js の HelloTimeSlot が select に入れる option（value = 枠 id、text = "20:00 - 21:30"）と同じ単位。
+
+- Timeslot: 開始・終了（0:00 からの分）、長さ、ラベル、枠 id、時間単価（Book ページの #tarief / #tariefId）と料金
+- SlotIndex: 開始時刻で並べた索引。「19:30〜20:30 に始まる 60 分以上の枠」を bisect で引く
+- match_start は開始時刻だけでなく長さも見る。
+  1,5 uur を頼んだのに 1 uur の枠（"20:00 - 21:00"）しか無い日を YES にしない
+
+キャッシュ（availability_cache.py）にあるその日の一覧に対して、ブラウザ無しで問い合わせられる:
+  python timeslots.py 2026-10-26 --from 19:30 --to 20:30 --min 60 [--accommodation 106] [--duration "1,5 uur"]
+"""
+
+import argparse
+import re
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+_RE_LABEL = re.compile(r"(\d{1,2}):(\d{2})(?:\s*-\s*(\d{1,2}):(\d{2}))?")
+_RE_OPTION = re.compile(r'<option\b[^>]*?value="([^"]*)"[^>]*>([^<]*)</option>', re.I)
+_RE_DURATION = re.compile(r"(\d+(?:[.,]\d+)?)\s*uur", re.I)
+_RE_INPUT = re.compile(r"<input\b[^>]*>", re.I)
+_RE_ATTR = re.compile(r'\b(id|value)="([^"]*)"', re.I)
+
+
+class Timeslot(NamedTuple):
+    start: int         # 0:00 からの分
+    end: int | None    # 日をまたぐ枠は 24:00 以降の分。ラベルに終了時刻が無ければ None
+    label: str
+    value: str = ""
+    tariff: float | None = None  # 時間単価（ユーロ、"Het uurtarief"）。読めなければ None
+    tariff_id: str = ""          # TariefID
+
+    @property
+    def minutes(self) -> int | None:
+        return None if self.end is None else self.end - self.start
+
+    @property
+    def price(self) -> float | None:
+        """時間単価 × 長さ。どちらか分からなければ None。"""
+        if self.tariff is None or self.minutes is None:
+            return None
+        return round(self.tariff * self.minutes / 60, 2)
+
+    @property
+    def start_hhmm(self) -> str:
+        return f"{self.start // 60:02d}:{self.start % 60:02d}"
+
+
+def to_minutes(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def duration_minutes(label: str) -> int:
+    """所要時間の表示（"1,5 uur" / "2 uur"）を分に。読めなければ 0（長さは見ない）。"""
+    m = _RE_DURATION.search(label or "")
+    return round(float(m.group(1).replace(",", ".")) * 60) if m else 0
+
+
+def parse_label(label: str, value: str = "") -> Timeslot | None:
+    m = _RE_LABEL.search(label)
+    if not m:
+        return None
+    h1, m1, h2, m2 = m.groups()
+    start = int(h1) * 60 + int(m1)
+    end = None if h2 is None else int(h2) * 60 + int(m2)
+    if end is not None and end <= start:
+        end += 24 * 60
+    return Timeslot(start, end, label.strip(), value)
+
+
+def parse_tariff(html: str) -> tuple[float | None, str]:
+    """Book ページの <input id="tarief" value="25,52"> と <input id="tariefId" value="38"> を読む。"""
+    values = {}
+    for tag in _RE_INPUT.findall(html):
+        attrs = {k.lower(): v for k, v in _RE_ATTR.findall(tag)}
+        if attrs.get("id") in ("tarief", "tariefId"):
+            values[attrs["id"]] = attrs.get("value", "")
+    return to_tariff(values.get("tarief", "")), values.get("tariefId", "")
+
+
+def to_tariff(text: str) -> float | None:
+    """"25,52" → 25.52（読めなければ None）。"""
+    try:
+        return float(text.strip().replace(".", "").replace(",", ".")) if text.strip() else None
+    except ValueError:
+        return None
+
+
+def with_tariff(slots: list[Timeslot], tariff: float | None, tariff_id: str = "") -> list[Timeslot]:
+    return [s._replace(tariff=tariff, tariff_id=tariff_id) for s in slots]
+
+
+def from_labels(labels: list[str]) -> list[Timeslot]:
+    return [s for s in (parse_label(t) for t in labels) if s]
+
+
+def parse_options(html: str) -> list[Timeslot]:
+    """<option value="..">20:00 - 21:30</option> の並びから枠 id 付きで読む。"""
+    return [s for s in (parse_label(t, v) for v, t in _RE_OPTION.findall(html)) if s]
+
+
+class SlotIndex:
+    """開始時刻順の索引。"""
+
+    def __init__(self, slots: list[Timeslot]):
+        self.slots = sorted(slots, key=lambda s: (s.start, s.start if s.end is None else s.end))
+        self._starts = [s.start for s in self.slots]
+
+    @classmethod
+    def from_labels(cls, labels: list[str]) -> "SlotIndex":
+        return cls(from_labels(labels))
+
+    def query(self, start_from: str | int, start_to: str | int | None = None,
+              min_minutes: int = 0) -> list[Timeslot]:
+        """開始が start_from〜start_to（両端含む）で、長さが min_minutes 以上の枠。
+        長さの分からない枠（終了時刻の無いラベル）は長さで落とさない。"""
+        lo = to_minutes(start_from) if isinstance(start_from, str) else start_from
+        hi = lo if start_to is None else to_minutes(start_to) if isinstance(start_to, str) else start_to
+        i, j = bisect_left(self._starts, lo), bisect_right(self._starts, hi)
+        return [s for s in self.slots[i:j] if s.minutes is None or s.minutes >= min_minutes]
+
+    def find(self, start_hhmm: str, min_minutes: int = 0) -> Timeslot | None:
+        hits = self.query(start_hhmm, None, min_minutes)
+        return hits[0] if hits else None
+
+    def __len__(self):
+        return len(self.slots)
+
+
+def match_slots(slots: list[Timeslot], start_hhmm: str, min_minutes: int = 0) -> tuple[bool, str]:
+    """start_hhmm に始まり min_minutes 以上続く枠があれば (True, そのラベル)。"""
+    slot = SlotIndex(slots).find(start_hhmm, min_minutes)
+    return (True, slot.label) if slot else (False, "")
+
+
+def match_start(labels: list[str], start_hhmm: str, min_minutes: int = 0) -> tuple[bool, str]:
+    """ラベル（画面の select・キャッシュ）版の match_slots。"""
+    return match_slots(from_labels(labels), start_hhmm, min_minutes)
+
+
+# ========= CLI（キャッシュに対する問い合わせ） =========
+def main(argv=None):
+    from availability_cache import AvailabilityCache, DEFAULT_CACHE_PATH
+
+    ap = argparse.ArgumentParser(description="query cached timeslots without a browser")
+    ap.add_argument("date", help="YYYY-MM-DD")
+    ap.add_argument("--from", dest="start_from", required=True, help="開始時刻の下限 HH:MM")
+    ap.add_argument("--to", dest="start_to", help="開始時刻の上限 HH:MM（省略時は --from と同じ）")
+    ap.add_argument("--min", dest="min_minutes", type=int, default=0, help="最低の長さ（分）")
+    ap.add_argument("--accommodation", default="106")
+    ap.add_argument("--duration", default="1,5 uur", help="キャッシュのキー（取得時の所要時間）")
+    ap.add_argument("--cache", default=str(DEFAULT_CACHE_PATH))
+    args = ap.parse_args(argv)
+
+    cache = AvailabilityCache(args.cache)
+    try:
+        labels = cache.get(args.accommodation, args.date, args.duration, max_age=float("inf"))
+    finally:
+        cache.close()
+    if labels is None:
+        print(f"no cached timeslots for #{args.accommodation} {args.date} ({args.duration})")
+        return
+    for s in SlotIndex.from_labels(labels).query(args.start_from, args.start_to, args.min_minutes):
+        print(f"{s.label}" + (f"  ({s.minutes} min)" if s.minutes is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+実行の各フェーズ（ブラウザ起動・画面遷移とそのリトライ・所要時間選択・datepicker・月切替・
+日付クリック・時刻 select 読み取り・HTTP 呼び出し）の所要時間を記録する。
+
+  with phase("goto", attempt=1, accom="106"):
+      ...
+
+- 記録は 1 フェーズ 1 行の JSON で TIMING_LOG（既定 .cache/timing.jsonl）に追記
+  {"run": ..., "phase": "goto", "ms": 812.4, "ok": true, "attempt": 1, "accom": "106", ...}
+- 実行の最後に report() でフェーズ毎の件数 / 合計 / p50 / p95 を標準エラーに表で出す
+  （標準出力は result.txt として公開されるので混ぜない）
+- GITHUB_STEP_SUMMARY があれば同じ表を Markdown で追記
+- TIMING=false で記録しない
+
+過去の記録から表だけ作り直す:
+  python timing.py [.cache/timing.jsonl] [--run RUN_ID | --all]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+ENABLED = os.getenv("TIMING", "true").lower() == "true"
+TIMING_LOG = Path(os.getenv("TIMING_LOG", ".cache/timing.jsonl"))
+RUN_ID = datetime.now().strftime("%Y%m%dT%H%M%S")
+
+_records: list[dict] = []
+_lock = threading.Lock()
+
+
+# ========= 記録 =========
+@contextmanager
+def phase(name: str, **ctx):
+    """with の中の経過時間を 1 件記録する。例外はそのまま投げ直す（ok=false で残る）。"""
+    if not ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        record(name, (time.perf_counter() - t0) * 1000, ok, **ctx)
+
+
+def record(name: str, ms: float, ok: bool = True, **ctx):
+    rec = {"run": RUN_ID, "ts": datetime.now().isoformat(timespec="milliseconds"),
+           "phase": name, "ms": round(ms, 1), "ok": ok}
+    rec.update({k: (v.strftime("%Y-%m-%d") if isinstance(v, datetime) else v) for k, v in ctx.items()})
+    with _lock:
+        _records.append(rec)
+
+
+def records() -> list[dict]:
+    with _lock:
+        return list(_records)
+
+
+# ========= 集計 =========
+def percentile(values: list[float], q: float) -> float:
+    """線形補間の分位点（q は 0〜1）。"""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    pos = (len(s) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+
+def summarize(recs: list[dict]) -> list[dict]:
+    """フェーズ毎の {phase, count, errors, total_ms, p50_ms, p95_ms, max_ms}（初出順）。"""
+    by_phase: dict[str, list[dict]] = {}
+    for r in recs:
+        by_phase.setdefault(r["phase"], []).append(r)
+    out = []
+    for name, rs in by_phase.items():
+        ms = [r["ms"] for r in rs]
+        out.append({
+            "phase": name,
+            "count": len(rs),
+            "errors": sum(1 for r in rs if not r.get("ok", True)),
+            "total_ms": round(sum(ms), 1),
+            "p50_ms": round(percentile(ms, 0.5), 1),
+            "p95_ms": round(percentile(ms, 0.95), 1),
+            "max_ms": round(max(ms), 1),
+        })
+    return out
+
+
+COLUMNS = ["phase", "count", "errors", "total_ms", "p50_ms", "p95_ms", "max_ms"]
+
+
+def format_table(summary: list[dict]) -> str:
+    widths = {c: max(len(c), *(len(str(s[c])) for s in summary)) for c in COLUMNS}
+    lines = ["  ".join(c.ljust(widths[c]) if c == "phase" else c.rjust(widths[c]) for c in COLUMNS)]
+    for s in summary:
+        lines.append("  ".join(str(s[c]).ljust(widths[c]) if c == "phase" else str(s[c]).rjust(widths[c])
+                               for c in COLUMNS))
+    return "\n".join(lines)
+
+
+def format_markdown(summary: list[dict], title: str) -> str:
+    lines = [f"### {title}", "", "| " + " | ".join(COLUMNS) + " |",
+             "|" + "|".join(["---"] + ["---:"] * (len(COLUMNS) - 1)) + "|"]
+    for s in summary:
+        lines.append("| " + " | ".join(str(s[c]) for c in COLUMNS) + " |")
+    return "\n".join(lines) + "\n"
+
+
+# ========= 出力 =========
+def flush(path: Path = TIMING_LOG) -> int:
+    """溜まった記録を JSON Lines で追記して空にする。書いた件数を返す。"""
+    with _lock:
+        recs, _records[:] = list(_records), []
+    if not recs:
+        return 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        for r in recs:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    return len(recs)
+
+
+def report(path: Path = TIMING_LOG):
+    """今回の記録を保存し、表を標準エラーと（CI なら）GITHUB_STEP_SUMMARY に出す。"""
+    recs = records()
+    if not recs:
+        return
+    summary = summarize(recs)
+    flush(path)
+    print(f"[TIMING] run {RUN_ID} ({len(recs)} records -> {path})", file=sys.stderr)
+    print(format_table(summary), file=sys.stderr, flush=True)
+    step = os.getenv("GITHUB_STEP_SUMMARY")
+    if step:
+        try:
+            with open(step, "a", encoding="utf-8") as f:
+                f.write("\n" + format_markdown(summary, f"Timing per phase (run {RUN_ID})"))
+        except OSError as e:
+            print(f"[TIMING] step summary failed: {e}", file=sys.stderr)
+
+
+def load(path: Path) -> list[dict]:
+    out = []
+    if not path.exists():
+        return out
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    continue
+    return out
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="timing.jsonl のフェーズ別集計")
+    ap.add_argument("path", nargs="?", default=str(TIMING_LOG))
+    ap.add_argument("--run", help="この run だけ集計（既定は最後の run）")
+    ap.add_argument("--all", action="store_true", help="全 run をまとめて集計")
+    ap.add_argument("--markdown", action="store_true", help="Markdown の表で出す")
+    args = ap.parse_args(argv)
+
+    recs = load(Path(args.path))
+    if not recs:
+        print("no records")
+        return
+    if not args.all:
+        run = args.run or recs[-1]["run"]
+        recs = [r for r in recs if r["run"] == run]
+        title = f"Timing per phase (run {run})"
+    else:
+        title = f"Timing per phase ({len({r['run'] for r in recs})} runs)"
+    summary = summarize(recs)
+    print(format_markdown(summary, title) if args.markdown else format_table(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Playwright トレースの取り方（TRACE_MODE）と保存数の上限。
+
+  off         取らない
+  on-failure  既定。施設（ページ）ごとにチャンクを切って記録し、
+              ERROR が出たチャンクだけ保存、成功したチャンクは捨てる
+  always      全チャンクを保存（ソースも含める）
+
+保存先は TRACE_DIR（既定 traces/）に trace-YYYYmmdd-HHMMSS-<施設id>.zip。
+TRACE_KEEP（既定 10）件を超えたら古いものから消す。
+
+concurrent_check のプールはワーカー（コンテキスト）ごとに AsyncTraceRecorder を持ち、
+「施設 × 月」のまとまりごとにチャンクを切る（名前は <施設id>-YYYYMM）。
+
+watch.py は常駐なので WATCH_TRACE_MODE（既定 off）を使い、always は on-failure に落とす。
+"""
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+TRACE_MODE = os.getenv("TRACE_MODE", "on-failure").lower()
+TRACE_DIR = Path(os.getenv("TRACE_DIR", "traces"))
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "10"))
+MODES = ("off", "on-failure", "always")
+
+
+def log(msg): print("[LOG]", msg, file=sys.stderr, flush=True)
+
+
+def rotate(trace_dir: Path = TRACE_DIR, keep: int = TRACE_KEEP):
+    """新しい順に keep 件だけ残す。"""
+    files = sorted(trace_dir.glob("trace-*.zip"), key=lambda f: f.stat().st_mtime, reverse=True)
+    for f in files[max(0, keep):]:
+        try:
+            f.unlink()
+        except OSError:
+            pass
+
+
+def chunk_path(trace_dir: Path, name: str) -> Path:
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return trace_dir / f"trace-{stamp}-{name}.zip"
+
+
+class TraceRecorder:
+    """1 つのコンテキストのトレースをチャンク単位で保存 / 破棄する。
+
+        tracer = TraceRecorder(context)
+        tracer.begin()
+        ... 施設 1 件分のチェック ...
+        tracer.end(accom["id"], failed)
+        tracer.close()
+    """
+
+    def __init__(self, context, mode: str = TRACE_MODE, trace_dir: Path = TRACE_DIR, keep: int = TRACE_KEEP):
+        self.context = context
+        self.mode = mode if mode in MODES else "on-failure"
+        self.trace_dir = Path(trace_dir)
+        self.keep = keep
+        self.active = False
+        self._open = False  # チャンクを記録中か（start() で最初のチャンクが開く）
+        if self.mode == "off":
+            return
+        try:
+            context.tracing.start(screenshots=True, snapshots=True, sources=self.mode == "always")
+            self.active = self._open = True
+        except Exception as e:
+            log(f"tracing unavailable ({str(e)[:80]})")
+
+    def begin(self):
+        if self.active and not self._open:
+            try:
+                self.context.tracing.start_chunk()
+                self._open = True
+            except Exception:
+                self.active = False
+
+    def end(self, name: str, failed: bool) -> Path | None:
+        """チャンクを閉じる。保存したらそのパスを返す。"""
+        if not (self.active and self._open):
+            return None
+        self._open = False
+        path = chunk_path(self.trace_dir, name) if failed or self.mode == "always" else None
+        try:
+            if path:
+                self.context.tracing.stop_chunk(path=str(path))
+                rotate(self.trace_dir, self.keep)
+            else:
+                self.context.tracing.stop_chunk()  # 成功したチャンクは捨てる
+        except Exception:
+            self.active = False
+            return None
+        return path
+
+    def close(self):
+        if not self.active:
+            return
+        try:
+            if self._open:
+                self.context.tracing.stop_chunk()
+            self.context.tracing.stop()
+        except Exception:
+            pass
+        self.active = self._open = False
+
+
+class AsyncTraceRecorder(TraceRecorder):
+    """TraceRecorder の async 版（async Playwright のコンテキスト用）。
+
+        tracer = AsyncTraceRecorder(context)
+        await tracer.start()
+        await tracer.begin() ... await tracer.end(name, failed) ...
+        await tracer.close()
+    """
+
+    def __init__(self, context, mode: str = TRACE_MODE, trace_dir: Path = TRACE_DIR, keep: int = TRACE_KEEP):
+        # tracing.start() は await が要るので start() で
+        super().__init__(context, "off", trace_dir, keep)
+        self.mode = mode if mode in MODES else "on-failure"
+
+    async def start(self):
+        if self.mode == "off":
+            return
+        try:
+            await self.context.tracing.start(screenshots=True, snapshots=True, sources=self.mode == "always")
+            self.active = self._open = True
+        except Exception as e:
+            log(f"tracing unavailable ({str(e)[:80]})")
+
+    async def begin(self):
+        if self.active and not self._open:
+            try:
+                await self.context.tracing.start_chunk()
+                self._open = True
+            except Exception:
+                self.active = False
+
+    async def end(self, name: str, failed: bool) -> Path | None:
+        if not (self.active and self._open):
+            return None
+        self._open = False
+        path = chunk_path(self.trace_dir, name) if failed or self.mode == "always" else None
+        try:
+            if path:
+                await self.context.tracing.stop_chunk(path=str(path))
+                rotate(self.trace_dir, self.keep)
+            else:
+                await self.context.tracing.stop_chunk()
+        except Exception:
+            self.active = False
+            return None
+        return path
+
+    async def close(self):
+        if not self.active:
+            return
+        try:
+            if self._open:
+                await self.context.tracing.stop_chunk()
+            await self.context.tracing.stop()
+        except Exception:
+            pass
+        self.active = self._open = False
+
+
+def has_error(rows: list[dict]) -> bool:
+    return any(r["available"] == "ERROR" for r in rows)
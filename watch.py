@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+常駐して空きを監視する（ブラウザを温めたまま一定間隔で再チェック）。
+- ブラウザ・ページは 1 回だけ起動し、ポーリング毎には datepicker 操作だけ行う
+  （WATCH_RELOAD_EVERY 回ごとにページを読み直して disabledDates 等を更新）
+- 間隔は WATCH_INTERVAL 秒 ± WATCH_JITTER（割合）でばらす
+- 前回の状態と比べて NO→YES になった枠だけイベントを出す
+  通知先 WATCH_NOTIFY（カンマ区切り）: stdout / file:events.jsonl / webhook:https://...
+- ブラウザが落ちたら作り直して続行（連続失敗時は待ち時間を伸ばす）
+- ENGINE=http ならブラウザ無しで同じことをする
+- slots.json の "accommodations" があれば全施設を 1 つのブラウザ（施設ごとに 1 ページ）で見る
+- WATCH_ADAPTIVE=true で枠ごとに間隔を変える（scheduler.AdaptivePoller）
+  最近状態が変わった枠・日付が近い枠は WATCH_INTERVAL 間隔、NO が続く枠は倍々に WATCH_MAX_INTERVAL まで。
+  1 時間あたりのリクエスト数は WATCH_BUDGET（既定 120）まで
+- トレースは WATCH_TRACE_MODE（既定 off）。on-failure なら ERROR の出た施設 1 回分だけ traces/ に残す
+  （常駐で全部取り続けるのは重いので always は on-failure 扱い）
+
+slots.json の "watch": {"interval": 120, "jitter": 0.2, "notify": ["stdout"],
+                        "adaptive": true, "max_interval": 3600, "budget": 120} でも設定可。
+状態は .cache/watch_state.json に残すので、再起動しても同じ枠で二重に通知しない。
+
+  python watch.py
+"""
+
+import json
+import os
+import random
+import signal
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+import check_next2weeks_targets as checker
+import timing
+from scheduler import AdaptivePoller
+from trace_capture import TraceRecorder, has_error
+
+STATE_PATH = Path(os.getenv("WATCH_STATE", ".cache/watch_state.json"))
+DEFAULT_INTERVAL = 120.0
+DEFAULT_JITTER = 0.2
+DEFAULT_RELOAD_EVERY = 10
+DEFAULT_MAX_INTERVAL = 3600.0
+DEFAULT_BUDGET = 120
+MAX_BACKOFF = 15 * 60
+TRACE_MODE = os.getenv("WATCH_TRACE_MODE", "off").lower().replace("always", "on-failure")
+
+
+def log(msg): print("[LOG]", msg, flush=True)
+
+
+# ========= 設定 =========
+def load_watch_config() -> dict:
+    try:
+        cfg = checker.read_slots_json().get("watch", {})
+    except Exception:
+        cfg = {}
+    notify = os.getenv("WATCH_NOTIFY")
+    return {
+        "interval": float(os.getenv("WATCH_INTERVAL") or cfg.get("interval", DEFAULT_INTERVAL)),
+        "jitter": float(os.getenv("WATCH_JITTER") or cfg.get("jitter", DEFAULT_JITTER)),
+        "reload_every": int(os.getenv("WATCH_RELOAD_EVERY") or cfg.get("reload_every", DEFAULT_RELOAD_EVERY)),
+        "notify": notify.split(",") if notify else list(cfg.get("notify", ["stdout"])),
+        "adaptive": (os.getenv("WATCH_ADAPTIVE") or str(cfg.get("adaptive", False))).lower() == "true",
+        "max_interval": float(os.getenv("WATCH_MAX_INTERVAL") or cfg.get("max_interval", DEFAULT_MAX_INTERVAL)),
+        "budget": int(os.getenv("WATCH_BUDGET") or cfg.get("budget", DEFAULT_BUDGET)),
+    }
+
+
+# ========= 通知 =========
+def emit(event: dict, sinks: list[str]):
+    line = json.dumps(event, ensure_ascii=False)
+    for sink in sinks:
+        sink = sink.strip()
+        try:
+            if sink == "stdout":
+                print(f"[EVENT] {event['date']} ({event['weekday']}) {event['start']} → "
+                      f"Available ✅ [{event['slot_label']}]", flush=True)
+            elif sink.startswith("file:"):
+                path = Path(sink[len("file:"):])
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.open("a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            elif sink.startswith("webhook:"):
+                req = urllib.request.Request(
+                    sink[len("webhook:"):], data=line.encode("utf-8"),
+                    headers={"Content-Type": "application/json"}, method="POST",
+                )
+                urllib.request.urlopen(req, timeout=10).close()
+            else:
+                log(f"unknown notify sink: {sink}")
+        except Exception as e:
+            # 通知の失敗で監視自体は止めない
+            log(f"notify {sink} failed: {e}")
+
+
+def load_state() -> dict[str, str]:
+    try:
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def save_state(state: dict[str, str]):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    STATE_PATH.write_text(json.dumps(state, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+def diff_rows(state: dict[str, str], rows: list[dict]) -> list[dict]:
+    """state を更新しつつ NO→YES に変わった行を返す。ERROR は状態を変えない。"""
+    flipped = []
+    for r in rows:
+        if r["available"] not in ("YES", "NO"):
+            continue
+        key = f"{r['date']} {r['start']} #{r.get('accommodation', '')}"
+        if r["available"] == "YES" and state.get(key, "NO") != "YES":
+            flipped.append(r)
+        state[key] = r["available"]
+    return flipped
+
+
+# ========= チェッカー =========
+class WarmPlaywright:
+    """ブラウザと施設ごとのページを起動したまま保持する。"""
+
+    def __init__(self, reload_every: int, accommodations: list[dict]):
+        self.reload_every = max(1, reload_every)
+        self.accommodations = accommodations
+        self.polls = 0
+        self.pw = self.browser = self.context = self.tracer = None
+        self.alive = False
+        self.pages: dict[str, object] = {}
+
+    def start(self):
+        from playwright.sync_api import sync_playwright
+
+        import browser_profile
+
+        self.pw = sync_playwright().start()
+        # BROWSER_ENDPOINT があれば共有の Chromium に繋ぐ（落ちたら is_connected() で気付いて繋ぎ直す）
+        # BROWSER_PROFILE があれば persistent context（browser は None）
+        self.browser, self.context = browser_profile.launch(self.pw, checker.HEADLESS)
+        self.alive = True
+        self.context.on("close", lambda *_: setattr(self, "alive", False))
+        self.context.set_default_timeout(30000)
+        self.tracer = TraceRecorder(self.context, TRACE_MODE)
+        if checker.blocking_enabled(checker.EVIDENCE.pixels):
+            checker.install_resource_filter(self.context, [a["url"] for a in self.accommodations],
+                                            keep_css=checker.EVIDENCE.pixels)
+        self.pages = {}
+        self.polls = 0
+
+    def check(self, plan: list[tuple]) -> list[dict]:
+        if not self.alive or (self.browser is not None and not self.browser.is_connected()):
+            self.close()
+            self.start()
+        reload = self.polls and self.polls % self.reload_every == 0
+        self.polls += 1
+        rows = []
+        for accom, targets in plan:
+            self.tracer.begin()
+            got = None
+            try:
+                page = self.pages.get(accom["id"])
+                if page is None:
+                    page = self.pages[accom["id"]] = self.context.new_page()
+                    checker.prepare_page(page, accom)
+                elif reload:
+                    checker.prepare_page(page, accom)
+                got = checker.check_on_page(page, targets, accom=accom)
+            finally:
+                saved = self.tracer.end(accom["id"], got is None or has_error(got))
+                if saved:
+                    log(f"trace saved: {saved}")
+            rows += got
+        return rows
+
+    def close(self):
+        if self.tracer is not None:
+            self.tracer.close()
+        if self.context is not None:
+            import browser_profile
+
+            browser_profile.close(self.browser, self.context)
+        try:
+            if self.pw:
+                self.pw.stop()
+        except Exception:
+            pass
+        self.pw = self.browser = self.context = self.tracer = None
+        self.alive = False
+        self.pages = {}
+
+
+class WarmHttp:
+    """HTTP エンジン版。1 つのセッションで施設ごとのトークンを使い回す。
+    WarmPlaywright の再読み込みと同じく reload_every 回ごと、および日付が変わったときに
+    Book ページを取り直す（トークンと day_index の disabledDates / minDate を新しくする）。"""
+
+    def __init__(self, reload_every: int):
+        self.reload_every = max(1, reload_every)
+        self.polls = 0
+        self.day = ""
+        self.session = None
+        self.engines: dict[str, checker.HttpEngine] = {}
+
+    def check(self, plan: list[tuple]) -> list[dict]:
+        if self.session is None:
+            self.session = checker.HttpSession(rate_limiter=checker.RATE_LIMITER)
+        today = datetime.now().strftime("%Y-%m-%d")
+        if (self.polls and self.polls % self.reload_every == 0) or today != self.day:
+            self.engines = {}
+            self.day = today
+        self.polls += 1
+        rows = []
+        for accom, targets in plan:
+            engine = self.engines.get(accom["id"])
+            if engine is None:
+                engine = self.engines[accom["id"]] = checker.HttpEngine(accom["url"], session=self.session)
+                engine.bootstrap()
+            rows += checker.check_with_engine(engine, targets, accom=accom)
+        return rows
+
+    def close(self):
+        if self.session:
+            self.session.close()
+        self.session = None
+        self.engines = {}
+        self.polls = 0
+
+
+# ========= ループ =========
+def _terminate(*_):
+    raise KeyboardInterrupt
+
+
+def main():
+    cfg = load_watch_config()
+    accommodations = checker.load_accommodation_list()
+    runner = WarmHttp(cfg["reload_every"]) if checker.ENGINE == "http" else WarmPlaywright(cfg["reload_every"], accommodations)
+    state = load_state()
+    failures = 0
+    poller = AdaptivePoller(cfg["interval"], cfg["max_interval"], cfg["budget"]) if cfg["adaptive"] else None
+    signal.signal(signal.SIGTERM, _terminate)
+    log(f"watch: interval={cfg['interval']}s jitter={cfg['jitter']} notify={cfg['notify']}"
+        + (f" adaptive(max={cfg['max_interval']}s budget={cfg['budget']}/h)" if poller else ""))
+
+    try:
+        while True:
+            # 日付は毎回計算し直す（日をまたいでも対象がずれない）
+            plan = [(a, checker.build_targets(a["weeks_ahead"], a["targets"])) for a in accommodations]
+            full_plan = plan
+            if poller:
+                plan = poller.due(full_plan)
+                if not plan:
+                    time.sleep(max(1.0, min(cfg["max_interval"], poller.next_wakeup(full_plan))))
+                    continue
+            try:
+                with timing.phase("poll", engine=checker.ENGINE):
+                    rows = runner.check(plan)
+                if rows and all(r["available"] == "ERROR" for r in rows):
+                    # 全滅はページ/ブラウザ側の故障とみなして作り直す
+                    raise RuntimeError(rows[0]["slot_label"])
+                failures = 0
+            except Exception as e:
+                failures += 1
+                log(f"check failed ({e}); restarting engine")
+                runner.close()
+                time.sleep(min(MAX_BACKOFF, cfg["interval"] * 2 ** (failures - 1)))
+                continue
+
+            now = datetime.now().isoformat(timespec="seconds")
+            for r in diff_rows(state, rows):
+                emit(dict(r, detected_at=now), cfg["notify"])
+            today = datetime.now().strftime("%Y-%m-%d")
+            save_state({k: v for k, v in state.items() if k[:10] >= today})
+            checker.save_results(rows)
+            timing.flush()
+
+            base = cfg["interval"]
+            if poller:
+                poller.update(rows)
+                poller.prune(today)
+                base = poller.next_wakeup(full_plan)
+            wait = base * (1 + random.uniform(-cfg["jitter"], cfg["jitter"]))
+            time.sleep(max(1.0, wait))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.close()
+        timing.flush()
+
+
+if __name__ == "__main__":
+    main()